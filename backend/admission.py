@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+
+# Reasons a request is shed, as reported in stats()
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+
+class AdmissionController:
+    """
+    Bounds how many submissions are processed at once, and how much request body
+    they hold between them.
+
+    Each request reserves one slot and its declared Content-Length (or
+    unknown_body_bytes when it doesn't declare one) for as long as the app works on
+    it. A request that doesn't fit waits, at most max_queue_wait_seconds and
+    behind at most max_queued others, for earlier ones to finish; otherwise it is
+    shed, to be retried after retry_after_seconds. A request arriving while
+    nothing is in flight is always admitted, however large.
+
+    All state lives on the event loop; no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 16,
+        max_in_flight_bytes: int = 256 * 1024 * 1024,
+        max_queued: int = 32,
+        max_queue_wait_seconds: float = 2,
+        retry_after_seconds: int = 5,
+        unknown_body_bytes: int = 4 * 1024 * 1024,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_bytes = max_in_flight_bytes
+        self.max_queued = max_queued
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.unknown_body_bytes = unknown_body_bytes
+        self._capacity_freed = asyncio.Condition()
+
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self.queued = 0
+
+        # Metrics
+        self.peak_in_flight = 0
+        self.peak_in_flight_bytes = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.admitted_after_queueing = 0
+        self.queue_wait_seconds = 0.0
+        self.shed = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_in_flight=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 16)),
+            max_in_flight_bytes=int(os.environ.get('ADMISSION_MAX_IN_FLIGHT_BYTES', 256 * 1024 * 1024)),
+            max_queued=int(os.environ.get('ADMISSION_MAX_QUEUED', 32)),
+            max_queue_wait_seconds=float(os.environ.get('ADMISSION_MAX_QUEUE_WAIT_SECONDS', 2)),
+            retry_after_seconds=int(os.environ.get('ADMISSION_RETRY_AFTER_SECONDS', 5)),
+            unknown_body_bytes=int(os.environ.get('ADMISSION_UNKNOWN_BODY_BYTES', 4 * 1024 * 1024)),
+        )
+
+    def fits(self, size: int) -> bool:
+        if self.in_flight == 0:
+            return True
+        return self.in_flight < self.max_in_flight and self.in_flight_bytes + size <= self.max_in_flight_bytes
+
+    async def acquire(self, size: int) -> Optional[str]:
+        """Reserve capacity for a request of `size` bytes; returns None once admitted, or why it was shed."""
+        if not self.fits(size):
+            if self.queued >= self.max_queued:
+                self.shed[QUEUE_FULL] += 1
+                return QUEUE_FULL
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+            started = time.monotonic()
+            try:
+                async with self._capacity_freed:
+                    await asyncio.wait_for(self._capacity_freed.wait_for(lambda: self.fits(size)), self.max_queue_wait_seconds)
+            except asyncio.TimeoutError:
+                self.shed[QUEUE_TIMEOUT] += 1
+                return QUEUE_TIMEOUT
+            finally:
+                self.queued -= 1
+                self.queue_wait_seconds += time.monotonic() - started
+            self.admitted_after_queueing += 1
+
+        self.admitted += 1
+        self.in_flight += 1
+        self.in_flight_bytes += size
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.peak_in_flight_bytes = max(self.peak_in_flight_bytes, self.in_flight_bytes)
+        return None
+
+    async def release(self, size: int):
+        self.in_flight -= 1
+        self.in_flight_bytes -= size
+        async with self._capacity_freed:
+            self._capacity_freed.notify_all()
+
+    def stats(self) -> dict:
+        queued_total = self.admitted_after_queueing + self.shed[QUEUE_TIMEOUT]
+        return {
+            "thresholds": {
+                "max_in_flight": self.max_in_flight,
+                "max_in_flight_bytes": self.max_in_flight_bytes,
+                "max_queued": self.max_queued,
+                "max_queue_wait_seconds": self.max_queue_wait_seconds,
+                "retry_after_seconds": self.retry_after_seconds,
+            },
+            "in_flight": self.in_flight,
+            "in_flight_bytes": self.in_flight_bytes,
+            "queued": self.queued,
+            "peak_in_flight": self.peak_in_flight,
+            "peak_in_flight_bytes": self.peak_in_flight_bytes,
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "admitted_after_queueing": self.admitted_after_queueing,
+            "average_queue_wait_ms": round(self.queue_wait_seconds / queued_total * 1000, 1) if queued_total else 0,
+            "shed": dict(self.shed),
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware running requests to `paths` through an AdmissionController.
+
+    Shed requests get a 429 with Retry-After before any of their body is read. The
+    body also carries success/message, which the submission form shows as is.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths)
+
+    def declared_size(self, scope) -> int:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    break
+        return self.controller.unknown_body_bytes
+
+    async def reject(self, send):
+        retry_after = self.controller.retry_after_seconds
+        message = f"We're receiving a lot of submissions right now. Please try again in {retry_after} seconds."
+        body = json.dumps({"detail": message, "success": False, "message": message}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or (scope["path"].rstrip("/") or "/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        size = self.declared_size(scope)
+        shed_reason = await self.controller.acquire(size)
+        if shed_reason is not None:
+            logging.warning(f"Shed {size} byte request to {scope['path']} ({shed_reason}): {self.controller.in_flight} in flight, {self.controller.in_flight_bytes} bytes")
+            await self.reject(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.controller.release(size)
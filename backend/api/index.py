@@ -0,0 +1,9 @@
+# Vercel entry point: the same app as server.py, run with the serverless profile
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault('RUNTIME_PROFILE', 'serverless')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import app  # noqa: E402,F401
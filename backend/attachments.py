@@ -0,0 +1,77 @@
+import base64
+from email.mime.base import MIMEBase
+
+from blob_store import BlobStore, load_image_bytes
+from uploads import IMAGE_FIELDS
+
+
+# Attachment filename label for each card image slot
+IMAGE_LABELS = {
+    "frontImage": "Front",
+    "backImage": "Back",
+    "receiptImage": "Receipt",
+}
+
+# (offset, magic bytes, MIME type), checked in order
+MAGIC_SIGNATURES = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"BM", "image/bmp"),
+    (0, b"%PDF-", "application/pdf"),
+    (4, b"ftypheic", "image/heic"),
+    (4, b"ftypheix", "image/heic"),
+    (4, b"ftypmif1", "image/heif"),
+    (4, b"ftypavif", "image/avif"),
+)
+
+
+def sniff_mime_type(data) -> str:
+    """MIME type from the file's magic bytes; client-supplied types are not trusted."""
+    header = bytes(memoryview(data)[:16])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for offset, magic, mime_type in MAGIC_SIGNATURES:
+        if header[offset:offset + len(magic)] == magic:
+            return mime_type
+    return "application/octet-stream"
+
+
+def build_attachment(data, filename: str) -> MIMEBase:
+    """
+    A base64 attachment encoded exactly once.
+
+    encoders.encode_base64 reads the payload back out of the message (a copy) before
+    encoding it; encoding the decoded bytes directly and declaring the transfer
+    encoding skips that round trip.
+    """
+    view = memoryview(data)
+    maintype, subtype = sniff_mime_type(view).split("/", 1)
+    attachment = MIMEBase(maintype, subtype)
+    attachment.set_payload(base64.encodebytes(view).decode("ascii"))
+    attachment["Content-Transfer-Encoding"] = "base64"
+    attachment.add_header("Content-Disposition", "attachment", filename=filename)
+    return attachment
+
+
+def attach_card_images(msg, cards, store: BlobStore) -> int:
+    """Attach every card image to msg, loading each one from the store exactly once."""
+    attachment_count = 0
+    for i, card in enumerate(cards, 1):
+        for field in IMAGE_FIELDS:
+            image = card[field]
+            if image is None:
+                continue
+            label = IMAGE_LABELS[field]
+            # A missing blob or undecodable inline image won't come back on a retry,
+            # so the email goes without it; anything else (the blob store being
+            # unreachable) fails the delivery, and the outbox retries it
+            try:
+                data = load_image_bytes(store, image)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"Failed to attach {label.lower()} image for card {i}: {e}")
+                continue
+            msg.attach(build_attachment(data, f"Card_{i}_{label}_{image.get('name') or field}"))
+            attachment_count += 1
+    return attachment_count
@@ -0,0 +1,98 @@
+"""
+Submission burst benchmark: memory and outcomes with and without admission control.
+
+Fires a burst of concurrent POSTs with multi-MB bodies at a stand-in submission
+endpoint that buffers the body and holds it while it "works" (the database and
+blob store writes of the real handler), first unprotected and then behind
+admission.AdmissionControlMiddleware with its default thresholds scaled down to
+the burst. Reports peak traced memory, how many requests were served or shed with
+429, and the latency of the served ones.
+
+    cd backend && python benchmarks/bench_admission.py [burst] [body_mb] [work_ms]
+"""
+import asyncio
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import JSONResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from admission import AdmissionController, AdmissionControlMiddleware  # noqa: E402
+
+PATH = "/api/submit-gift-card"
+
+
+def build_app(work_seconds: float, controller=None):
+    async def submit(request):
+        body = await request.body()
+        # Decoded copy, like parsing the JSON submission
+        decoded = bytes(body)
+        await asyncio.sleep(work_seconds)
+        return JSONResponse({"success": True, "size": len(decoded)})
+
+    app = Starlette(routes=[Route(PATH, submit, methods=["POST"])])
+    if controller is not None:
+        app = AdmissionControlMiddleware(app, controller, [PATH])
+    return app
+
+
+async def burst(app, requests: int, body: bytes):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post():
+            started = time.perf_counter()
+            response = await client.post(PATH, content=body)
+            return response.status_code, time.perf_counter() - started
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        results = await asyncio.gather(*(post() for _ in range(requests)))
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+    return results, peak
+
+
+def report(label, results, peak):
+    served = sorted(seconds for status, seconds in results if status == 200)
+    shed = sum(1 for status, _ in results if status == 429)
+    p50 = statistics.median(served) * 1000 if served else 0
+    p99 = served[max(0, int(len(served) * 0.99) - 1)] * 1000 if served else 0
+    print(f"{label:<22} peak {peak / 1024 / 1024:7.1f} MB   served {len(served):4}   shed {shed:4}   p50 {p50:7.0f} ms   p99 {p99:7.0f} ms")
+
+
+async def main(requests: int, body_mb: float, work_ms: float):
+    body = b"x" * int(body_mb * 1024 * 1024)
+    work_seconds = work_ms / 1000
+    print(f"burst of {requests} x {body_mb:g} MB submissions, {work_ms:.0f} ms of work each\n")
+
+    report("no admission control", *await burst(build_app(work_seconds), requests, body))
+
+    # A quarter of the burst in flight, as many again queued for up to 4 requests' work
+    controller = AdmissionController(
+        max_in_flight=max(1, requests // 4),
+        max_in_flight_bytes=max(1, requests // 4) * len(body),
+        max_queued=max(1, requests // 4),
+        max_queue_wait_seconds=4 * work_seconds,
+    )
+    report("admission control", *await burst(build_app(work_seconds, controller), requests, body))
+    print(f"\n{controller.stats()}")
+
+
+if __name__ == "__main__":
+    # Every shed request logs a warning
+    logging.basicConfig(level=logging.ERROR)
+    args = sys.argv[1:]
+    asyncio.run(main(
+        int(args[0]) if len(args) > 0 else 40,
+        float(args[1]) if len(args) > 1 else 4,
+        float(args[2]) if len(args) > 2 else 200,
+    ))
@@ -0,0 +1,73 @@
+"""
+Gift card validation cost benchmark.
+
+Reports the per-card cost of:
+
+  dict      - the original List[dict] field (no checks at all)
+  typed     - models.GiftCard validation at ingress (Decimal value, enums, image refs)
+
+Typed validation is measured with small and multi-MB base64 images to show the
+cost does not grow with image size: image strings are checked, not copied.
+
+    cd backend && python benchmarks/bench_card_validation.py [cards] [runs]
+"""
+import base64
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from models import GiftCard  # noqa: E402
+from uploads import IMAGE_FIELDS  # noqa: E402
+
+
+def build_cards(count: int, image_bytes: int) -> list:
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_bytes)).decode()
+    return [
+        {
+            "brand": "Amazon",
+            "value": "125.50",
+            "condition": "partially-used" if i % 2 else "new",
+            "hasReceipt": "yes",
+            "cardType": "physical",
+            "digitalCode": "",
+            "digitalPin": "",
+            **{field: {"name": f"{field}.jpg", "type": "image/jpeg", "size": image_bytes, "data": image} for field in IMAGE_FIELDS},
+        }
+        for i in range(count)
+    ]
+
+
+def per_card_us(func, cards: list, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(cards)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) / len(cards) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    dict_cards = TypeAdapter(List[dict])
+    typed_cards = TypeAdapter(List[GiftCard])
+
+    print(f"{count} cards per run, median of {runs} runs, microseconds per card\n")
+    for label, image_bytes in (("1 KB images", 1024), ("1 MB images", 1024 * 1024)):
+        cards = build_cards(count, image_bytes)
+
+        print(label)
+        print(f"  dict    {per_card_us(dict_cards.validate_python, cards, runs):8.1f}")
+        print(f"  typed   {per_card_us(typed_cards.validate_python, cards, runs):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
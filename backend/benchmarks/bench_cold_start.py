@@ -0,0 +1,103 @@
+"""
+Serverless cold start import benchmark, with a budget.
+
+Imports the Vercel entry point (api/index.py, serverless profile) in fresh
+interpreters under `python -X importtime` and reports the median total import
+time and the slowest modules the app imports directly. MONGO_URL points at an
+unresolvable mongodb+srv:// host, so any network I/O at import would show up as
+a multi-second stall (or an error).
+
+Exits non-zero, so it can gate a build, when:
+  - the median import time exceeds the budget (COLD_START_BUDGET_MS, default 900
+    ms, or the second argument; calibrate it for the machine running the check)
+  - any module that should only load on first use (SMTP, MIME, Pillow, Motor,
+    httpx) was imported
+
+    cd backend && python benchmarks/bench_cold_start.py [runs] [budget_ms]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Deferred with lazy_imports.lazy_import (or only imported inside functions)
+DEFERRED_MODULES = (
+    "smtplib",
+    "email.mime.base",
+    "email.mime.multipart",
+    "email.mime.text",
+    "PIL.Image",
+    "motor.motor_asyncio",
+    "httpx",
+)
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_once():
+    env = dict(
+        os.environ,
+        VERCEL="1",
+        MONGO_URL="mongodb+srv://cold-start.invalid/benchmark",
+        DB_NAME="benchmark",
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import index"],
+        cwd=BACKEND_DIR / "api",
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules[name] = (int(cumulative) / 1000, len(indent))
+    return modules
+
+
+def main(runs: int, budget_ms: float):
+    samples = [import_once() for _ in range(runs)]
+    totals = [modules["index"][0] for modules in samples]
+    median = statistics.median(totals)
+
+    # Direct imports of server.py, from the median run
+    modules = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    server_depth = modules["server"][1]
+    children = sorted(
+        ((ms, name) for name, (ms, depth) in modules.items() if depth == server_depth + 2),
+        reverse=True,
+    )
+
+    print(f"cold import of api/index.py, {runs} runs: median {median:.0f} ms (min {min(totals):.0f}, max {max(totals):.0f})\n")
+    print("slowest imports by server.py:")
+    for ms, name in children[:10]:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    failures = []
+    imported = sorted({name for run in samples for name in run} & set(DEFERRED_MODULES))
+    if imported:
+        failures.append(f"imported at cold start, should load on first use: {', '.join(imported)}")
+    if median > budget_ms:
+        failures.append(f"median {median:.0f} ms exceeds the {budget_ms:.0f} ms budget")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: within the {budget_ms:.0f} ms budget ({budget_ms - median:.0f} ms headroom), no deferred modules imported")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if len(args) > 0 else 5,
+        float(args[1]) if len(args) > 1 else float(os.environ.get('COLD_START_BUDGET_MS', 900)),
+    )
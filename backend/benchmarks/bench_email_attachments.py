@@ -0,0 +1,140 @@
+"""
+Attachment pipeline memory benchmark.
+
+Builds and "sends" the internal notification for a 5-card, 15-image submission and
+reports peak traced memory for:
+
+  legacy    - base64 data URLs in the document, split + b64decode + encode_base64,
+              then smtplib.send_message (flatten, dot-stuff and fix line endings)
+  pipeline  - images loaded once from the blob store, encoded once, streamed into
+              the DATA phase by smtp_pool.stream_message
+
+No mail server is needed: a fake SMTP connection accepts and discards the data.
+
+    cd backend && python benchmarks/bench_email_attachments.py [image_kb]
+"""
+import base64
+import os
+import smtplib
+import sys
+import tempfile
+import time
+import tracemalloc
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from attachments import attach_card_images  # noqa: E402
+from blob_store import LocalBlobStore  # noqa: E402
+from smtp_pool import stream_message  # noqa: E402
+
+CARDS = 5
+IMAGE_FIELDS = ("frontImage", "backImage", "receiptImage")
+
+
+class NullSocket:
+    def __init__(self):
+        self.bytes_received = 0
+
+    def sendall(self, data):
+        self.bytes_received += len(data)
+
+
+class FakeSMTP(smtplib.SMTP):
+    """An SMTP client whose server accepts every command and discards the data."""
+
+    def __init__(self):
+        super().__init__()
+        self.sock = NullSocket()
+        self._last_command = ""
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def putcmd(self, cmd, args=""):
+        self._last_command = cmd.lower()
+
+    def getreply(self):
+        if self._last_command == "data":
+            self._last_command = ""
+            return 354, b"go ahead"
+        return 250, b"ok"
+
+    def send(self, s):
+        self.sock.sendall(s)
+
+
+def new_message():
+    msg = MIMEMultipart()
+    msg['From'] = "noreply@example.com"
+    msg['To'] = "operations@example.com"
+    msg['Subject'] = "New Form Submission - Reference GC-250101-0000001"
+    msg.attach(MIMEText("<p>benchmark</p>", 'html'))
+    return msg
+
+
+def legacy_send(cards):
+    msg = new_message()
+    for i, card in enumerate(cards, 1):
+        for field in IMAGE_FIELDS:
+            image_data = card[field]['data']
+            if image_data.startswith('data:'):
+                image_data = image_data.split(',')[1]
+            decoded_data = base64.b64decode(image_data)
+            attachment = MIMEBase('application', 'octet-stream')
+            attachment.set_payload(decoded_data)
+            encoders.encode_base64(attachment)
+            attachment.add_header('Content-Disposition', f'attachment; filename=Card_{i}_{field}.jpg')
+            msg.attach(attachment)
+    FakeSMTP().send_message(msg)
+
+
+def pipeline_send(cards, store):
+    msg = new_message()
+    attach_card_images(msg, cards, store)
+    stream_message(FakeSMTP(), msg)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    image_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    images = [b"\xff\xd8\xff\xe0" + os.urandom(image_kb * 1024) for _ in range(CARDS * len(IMAGE_FIELDS))]
+    raw_total = sum(len(image) for image in images)
+
+    legacy_cards = [
+        {field: {"data": "data:image/jpeg;base64," + base64.b64encode(images[c * 3 + f]).decode()} for f, field in enumerate(IMAGE_FIELDS)}
+        for c in range(CARDS)
+    ]
+
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalBlobStore(root)
+        stored_cards = [
+            {field: {"name": f"{field}.jpg", "sha256": store.put(images[c * 3 + f])} for f, field in enumerate(IMAGE_FIELDS)}
+            for c in range(CARDS)
+        ]
+        del images
+
+        print(f"{CARDS} cards, {CARDS * len(IMAGE_FIELDS)} images, {raw_total / 1e6:.1f} MB of image data\n")
+        for label, func, args in (
+            ("legacy", legacy_send, (legacy_cards,)),
+            ("pipeline", pipeline_send, (stored_cards, store)),
+        ):
+            peak, elapsed = measure(func, *args)
+            print(f"{label:<10} peak {peak / 1e6:8.1f} MB  ({peak / raw_total:4.1f}x image data)   {elapsed * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
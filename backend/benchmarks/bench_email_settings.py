@@ -0,0 +1,60 @@
+"""
+Per-email configuration overhead benchmark.
+
+  legacy  - what every send used to do: read the SMTP_* / OPERATIONS_EMAIL keys from
+            os.environ, parse the port, lowercase SMTP_USE_SSL and build a fresh
+            ssl.create_default_context() (which loads the CA bundle from disk)
+  cached  - email_settings.get_email_settings() and get_ssl_context(), parsed and
+            built once
+
+    cd backend && python benchmarks/bench_email_settings.py [iterations]
+"""
+import os
+import ssl
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from email_settings import get_email_settings, get_ssl_context  # noqa: E402
+
+
+def legacy_setup():
+    smtp_server = os.environ.get('SMTP_SERVER')
+    smtp_port = int(os.environ.get('SMTP_PORT', 465))
+    smtp_username = os.environ.get('SMTP_USERNAME')
+    smtp_password = os.environ.get('SMTP_PASSWORD')
+    use_ssl = os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true'
+    operations_email = os.environ.get('OPERATIONS_EMAIL')
+    context = ssl.create_default_context()
+    return smtp_server, smtp_port, smtp_username, smtp_password, use_ssl, operations_email, context
+
+
+def cached_setup():
+    settings = get_email_settings()
+    return settings, get_ssl_context()
+
+
+def per_call_us(func, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    os.environ.setdefault('SMTP_SERVER', 'smtp.example.com')
+    os.environ.setdefault('SMTP_USERNAME', 'noreply@example.com')
+    os.environ.setdefault('SMTP_PASSWORD', 'secret')
+    os.environ.setdefault('OPERATIONS_EMAIL', 'ops@example.com')
+
+    legacy = per_call_us(legacy_setup, iterations)
+    cached = per_call_us(cached_setup, iterations * 100)
+    print(f"legacy  {legacy:10.1f} us per email")
+    print(f"cached  {cached:10.3f} us per email   ({legacy / cached:,.0f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Email template rendering benchmark.
+
+Compares renders/sec of the precompiled templates against re-parsing the template
+source on every render (str.format) and, for the internal notification, against the
+old per-card string concatenation loop.
+
+    cd backend && python benchmarks/bench_email_templates.py
+"""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from email_templates import (  # noqa: E402
+    CARD_LINE_TEMPLATE,
+    CONFIRMATION_TEMPLATE,
+    DIGITAL_CARD_LINE_TEMPLATE,
+    INTERNAL_NOTIFICATION_TEMPLATE,
+    generate_confirmation_email_html,
+    generate_internal_notification_email,
+)
+
+CARDS = 10
+ROUNDS = 5
+
+SUBMISSION = {
+    "email": "jane@example.com",
+    "phoneNumber": "555-0123",
+    "paymentMethod": "paypal",
+    "paypalAddress": "jane@example.com",
+    "submitted_at": "2025-01-01T12:00:00",
+    "cards": [
+        {
+            "brand": "Amazon",
+            "value": "100",
+            "condition": "partially-used",
+            "hasReceipt": "yes",
+            "cardType": "digital" if i % 2 else "physical",
+            "digitalCode": "ABCD-EFGH",
+            "digitalPin": "1234",
+        }
+        for i in range(CARDS)
+    ],
+}
+
+
+def confirmation_reparsed():
+    return CONFIRMATION_TEMPLATE.source.format(customer_name="Jane Doe", reference_number="GC-250101-000001")
+
+
+def internal_concatenated():
+    # The previous implementation: one growing string, re-copied for every card
+    cards_info = ""
+    total_value = 0
+    for i, card in enumerate(SUBMISSION["cards"], 1):
+        total_value += float(card["value"]) if card["value"].replace('.', '').isdigit() else 0
+        cards_info += CARD_LINE_TEMPLATE.source.format(
+            index=i,
+            brand=card.get('brand', 'N/A'),
+            value=card.get('value', '0'),
+            condition=card.get('condition', 'N/A').replace('-', ' ').title(),
+            receipt="Yes" if card.get('hasReceipt') == 'yes' else "No",
+            card_type=card.get('cardType', 'N/A').title(),
+        )
+        if card.get('cardType') == 'digital':
+            cards_info += DIGITAL_CARD_LINE_TEMPLATE.source.format(
+                digital_code=card.get('digitalCode', 'N/A'),
+                digital_pin=card.get('digitalPin', 'Not provided'),
+            )
+        cards_info += "\n"
+    return INTERNAL_NOTIFICATION_TEMPLATE.source.format(
+        reference_number="GC-250101-000001",
+        customer_name="Jane Doe",
+        email=SUBMISSION["email"],
+        phone_number=SUBMISSION["phoneNumber"],
+        payment_details=f"PayPal: {SUBMISSION['paypalAddress']}",
+        cards_info=cards_info,
+        total_value=total_value,
+        submitted_at=SUBMISSION["submitted_at"],
+    )
+
+
+def renders_per_second(func):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=ROUNDS, number=number))
+    return number / best
+
+
+def main():
+    rows = [
+        ("confirmation, re-parsed per render", confirmation_reparsed),
+        ("confirmation, precompiled", lambda: generate_confirmation_email_html("Jane Doe", "GC-250101-000001")),
+        (f"internal ({CARDS} cards), concatenated", internal_concatenated),
+        (f"internal ({CARDS} cards), precompiled", lambda: generate_internal_notification_email("Jane Doe", "GC-250101-000001", SUBMISSION)),
+    ]
+    for label, func in rows:
+        print(f"{label:<40} {renders_per_second(func):>12,.0f} renders/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Insert batching load test.
+
+Many concurrent clients insert documents as fast as they can for a fixed time,
+either with one insert_one each (the old path) or through write_batching.InsertBatcher.
+The collection is a stand-in with a fixed round-trip time, a small per-document
+cost and a limited number of connections (Motor's maxPoolSize), which is where
+one round trip per document runs out of room.
+
+Prints inserts/sec, per-insert latency and the batcher's own stats() as served
+by /api/metrics.
+
+    cd backend && python benchmarks/bench_insert_batching.py [clients] [seconds] [rtt_ms]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId  # noqa: E402
+from pymongo import WriteConcern  # noqa: E402
+
+from write_batching import InsertBatcher  # noqa: E402
+
+POOL_SIZE = 10
+PER_DOCUMENT_MS = 0.02
+
+
+class FakeCollection:
+    name = "gift_card_submissions"
+    write_concern = WriteConcern(w="majority")
+
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.connections = asyncio.Semaphore(POOL_SIZE)
+        self.round_trips = 0
+
+    async def _round_trip(self, documents):
+        async with self.connections:
+            self.round_trips += 1
+            for document in documents:
+                document.setdefault("_id", ObjectId())
+            await asyncio.sleep(self.rtt + len(documents) * PER_DOCUMENT_MS / 1000)
+
+    async def insert_one(self, document):
+        await self._round_trip([document])
+
+    async def insert_many(self, documents, ordered=True):
+        await self._round_trip(documents)
+
+
+class FakeDatabase:
+    def __init__(self, collection: FakeCollection):
+        self.collection = collection
+
+    def get_collection(self, name, write_concern=None):
+        return self.collection
+
+
+async def load(insert, clients: int, seconds: float):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await insert({"reference_number": "GC-000000-0000000", "status": "under_review"})
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+def report(label, latencies, seconds, round_trips):
+    ordered = sorted(latencies)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    print(
+        f"{label:<10} {len(latencies) / seconds:9.0f} inserts/s   p50 {statistics.median(ordered) * 1000:6.1f} ms"
+        f"   p99 {p99 * 1000:6.1f} ms   {round_trips} round trips"
+    )
+
+
+async def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rtt_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    print(f"{clients} clients, {seconds:.0f} s, {rtt_ms} ms round trip, {POOL_SIZE} connections\n")
+
+    collection = FakeCollection(rtt_ms)
+    report("insert_one", await load(collection.insert_one, clients, seconds), seconds, collection.round_trips)
+
+    collection = FakeCollection(rtt_ms)
+    batcher = InsertBatcher(FakeDatabase(collection), "gift_card_submissions")
+    latencies = await load(batcher.insert, clients, seconds)
+    await batcher.close()
+    report("batched", latencies, seconds, collection.round_trips)
+
+    print("\nbatcher stats:")
+    print(json.dumps(batcher.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
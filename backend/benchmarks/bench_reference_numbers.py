@@ -0,0 +1,73 @@
+"""
+Reference number uniqueness and throughput benchmark.
+
+Runs several worker processes, each with its own ReferenceNumberAllocator, against
+one shared atomic counter (a multiprocessing.Value standing in for the Mongo
+`counters` document) and checks that every generated reference is unique.
+
+    cd backend && python benchmarks/bench_reference_numbers.py [total_ids] [workers]
+"""
+import asyncio
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from reference_numbers import ReferenceNumberAllocator  # noqa: E402
+
+BLOCK_SIZE = 20
+
+
+def worker(counter, count, queue):
+    async def reserve(n):
+        # Same contract as mongo_counter(): atomic $inc, return the new value
+        with counter.get_lock():
+            counter.value += n
+            return counter.value
+
+    async def generate():
+        allocator = ReferenceNumberAllocator(reserve, block_size=BLOCK_SIZE)
+        return [await allocator.next_reference() for _ in range(count)], allocator.blocks_reserved
+
+    started = time.perf_counter()
+    references, blocks = asyncio.run(generate())
+    queue.put((references, blocks, time.perf_counter() - started))
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    per_worker = total // workers
+
+    counter = multiprocessing.Value('q', 0)
+    queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(counter, per_worker, queue)) for _ in range(workers)]
+
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    seen = set()
+    generated = 0
+    for references, _, _ in results:
+        generated += len(references)
+        seen.update(references)
+    duplicates = generated - len(seen)
+
+    print(f"workers:             {workers}")
+    print(f"references:          {generated:,}")
+    print(f"duplicates:          {duplicates}")
+    print(f"counter round trips: {sum(blocks for _, blocks, _ in results):,} (block size {BLOCK_SIZE})")
+    print(f"per-worker rate:     {min(per_worker / secs for _, _, secs in results):,.0f} - {max(per_worker / secs for _, _, secs in results):,.0f} ids/sec")
+    print(f"wall time:           {elapsed:.2f} s")
+    sys.exit(1 if duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
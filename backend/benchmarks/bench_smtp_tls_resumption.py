@@ -0,0 +1,115 @@
+"""
+SMTP TLS session resumption benchmark.
+
+Starts a minimal implicit-TLS SMTP server on localhost (self-signed certificate
+generated with the openssl CLI) and sends messages through an SMTPConnectionPool
+with max_messages=1, so every send opens a new connection the way reconnects
+after idle timeouts or server-side closes do. Runs once with session resumption
+off and once with it on, and prints the per-send TLS handshake times and the
+pool's resumption stats.
+
+    cd backend && python benchmarks/bench_smtp_tls_resumption.py [sends]
+"""
+import socket
+import socketserver
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smtp_pool import SMTPConnectionPool  # noqa: E402
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(b"220 localhost ESMTP\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250-localhost\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif command == b"AUTH":
+                self.wfile.write(b"235 2.7.0 Authentication successful\r\n")
+            elif command == b"DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.wfile.write(b"250 OK\r\n")
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+class TLSServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, context):
+        self.context = context
+        super().__init__(address, SMTPHandler)
+
+    def get_request(self):
+        sock, address = super().get_request()
+        return self.context.wrap_socket(sock, server_side=True), address
+
+
+def make_certificate(directory: str):
+    cert, key = f"{directory}/cert.pem", f"{directory}/key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def run(port: int, cafile: str, sends: int, resume: bool):
+    pool = SMTPConnectionPool(
+        "localhost", port, "user", "password",
+        size=1, max_messages=1,
+        ssl_context=ssl.create_default_context(cafile=cafile),
+        resume_tls_sessions=resume,
+    )
+    results = []
+    for i in range(sends):
+        msg = MIMEText(f"message {i}")
+        msg["From"], msg["To"], msg["Subject"] = "a@example.com", "b@example.com", "benchmark"
+        results.append(pool.send_message(msg))
+    pool.close()
+    return results, pool.stats()
+
+
+def main():
+    sends = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = TLSServer(("127.0.0.1", port), server_context)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        for label, resume in (("resumption off", False), ("resumption on", True)):
+            results, stats = run(port, cert, sends, resume)
+            handshakes = [r["tls_handshake_ms"] for r in results]
+            print(f"{label}:")
+            print(f"  per-send TLS handshake ms: {handshakes}")
+            print(f"  resumed: {stats['tls_resumed_handshakes']}/{stats['handshakes']} "
+                  f"(rate {stats['tls_resumption_rate']})   avg full {stats['avg_tls_full_handshake_ms']} ms   "
+                  f"avg resumed {stats['avg_tls_resumed_handshake_ms']} ms\n")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Submission hot path benchmark: parse + validate + BSON encode.
+
+Times the work done on the event loop for one /api/submit-gift-card request body
+before it reaches Mongo, for 1-, 5- and 10-card payloads with three base64 data
+URL images per card:
+
+  legacy   - json.loads, the original List[dict] submission model, .dict() deep
+             copy, bson.encode (what insert_one does before writing to the socket)
+  orjson   - orjson.loads (json_routing.ORJSONRequest), the typed
+             models.GiftCardSubmission, to_document(), bson.encode
+
+No database is needed.
+
+    cd backend && python benchmarks/bench_submission_json.py [image_kb] [runs]
+"""
+import base64
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import bson  # noqa: E402
+import orjson  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from models import GiftCardSubmission  # noqa: E402
+from uploads import IMAGE_FIELDS  # noqa: E402
+
+CARD_COUNTS = (1, 5, 10)
+
+
+class LegacySubmission(BaseModel):
+    # The submission model as it was before cards were typed
+    firstName: str
+    lastName: str
+    email: str
+    phoneNumber: Optional[str] = ""
+    cards: List[dict]
+    paymentMethod: str
+    paypalAddress: Optional[str] = ""
+    zelleDetails: Optional[str] = ""
+    cashAppTag: Optional[str] = ""
+    btcAddress: Optional[str] = ""
+    chimeDetails: Optional[str] = ""
+
+
+def build_body(cards: int, image_kb: int) -> bytes:
+    image = "data:image/jpeg;base64," + base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    payload = {
+        "firstName": "Jane",
+        "lastName": "Doe",
+        "email": "jane@example.com",
+        "phoneNumber": "+1 555 0100",
+        "cards": [
+            {
+                "brand": "Amazon",
+                "value": "100",
+                "condition": "new",
+                "hasReceipt": "yes",
+                "cardType": "physical",
+                **{field: {"name": f"{field}.jpg", "type": "image/jpeg", "data": image} for field in IMAGE_FIELDS},
+            }
+            for _ in range(cards)
+        ],
+        "paymentMethod": "paypal",
+        "paypalAddress": "jane@example.com",
+    }
+    return json.dumps(payload).encode()
+
+
+def legacy(body: bytes) -> bytes:
+    warnings.simplefilter("ignore", DeprecationWarning)  # .dict() is the old code path on purpose
+    submission = LegacySubmission(**json.loads(body))
+    return bson.encode(submission.dict())
+
+
+def orjson_path(body: bytes) -> bytes:
+    submission = GiftCardSubmission(**orjson.loads(body))
+    return bson.encode(submission.to_document())
+
+
+def measure(func, body: bytes, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(body)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    image_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+
+    print(f"{image_kb} KB per image, 3 images per card, median of {runs} runs\n")
+    print(f"{'cards':>5} {'body MB':>8} {'legacy ms':>10} {'orjson ms':>10} {'speedup':>8}")
+    for cards in CARD_COUNTS:
+        body = build_body(cards, image_kb)
+        before = measure(legacy, body, runs)
+        after = measure(orjson_path, body, runs)
+        print(f"{cards:>5} {len(body) / 1e6:>8.1f} {before * 1000:>10.1f} {after * 1000:>10.1f} {before / after:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Submission latency and email delivery time: sending inline vs queued, per runtime profile.
+
+Posts gift card submissions to /api/submit-gift-card one after another and reports
+the request latency, then how email delivery proceeds:
+  inline      - the baseline before the outbox: the handler stores the submission
+                and then sends both emails itself before responding (server profile,
+                no jobs queued, no dispatcher)
+  server      - the in-process outbox dispatcher sends while requests are served;
+                reports when the last email went out
+  serverless  - nothing runs between requests; /api/cron/deliver-emails (which
+                Vercel runs once a minute) is called until the outbox is empty,
+                each run stopping at its EMAIL_DRAIN_TIME_BUDGET_SECONDS; reports
+                how many runs that took
+
+Each mode runs in its own process, as RUNTIME_PROFILE is read at import. The
+database is an in-memory stand-in with a fixed round-trip time that supports the
+operations the submission path uses; each email is a blocking sleep of smtp_ms in
+place of SMTP connect + TLS + send, as in bench_email_event_loop.py.
+
+    cd backend && python benchmarks/bench_submit_latency.py [requests] [smtp_ms] [rtt_ms]
+"""
+import asyncio
+import contextlib
+import io
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId  # noqa: E402
+from pymongo import WriteConcern  # noqa: E402
+from pymongo.errors import DuplicateKeyError  # noqa: E402
+
+MODES = ("inline", "server", "serverless")
+CRON_SECRET = "bench"
+
+SUBMISSION = {
+    "firstName": "Bench",
+    "lastName": "Mark",
+    "email": "bench@example.com",
+    "phoneNumber": "5550100",
+    "cards": [{"brand": "Amazon", "value": "50", "condition": "new", "hasReceipt": "yes", "cardType": "digital", "digitalCode": "ABCD-1234"}],
+    "paymentMethod": "paypal",
+    "paypalAddress": "bench@example.com",
+}
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, branch) for branch in condition):
+                return False
+            continue
+        value = document.get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lte" in condition and (value is None or value > condition["$lte"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class UpdateResult:
+    def __init__(self, modified_count):
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the submission and outbox code paths."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.documents = []
+
+    @property
+    def write_concern(self):
+        return WriteConcern()
+
+    def _find(self, query):
+        return next((d for d in self.documents if matches(d, query)), None)
+
+    def _update(self, document, update):
+        document.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            document[key] = document.get(key, 0) + amount
+
+    async def insert_one(self, document):
+        await asyncio.sleep(self.rtt)
+        document.setdefault("_id", ObjectId())
+        if self._find({"_id": document["_id"]}) is not None:
+            raise DuplicateKeyError("duplicate key")
+        self.documents.append(document)
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.rtt)
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        self.documents.extend(documents)
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(self.rtt)
+        document = self._find(query)
+        return dict(document) if document is not None else None
+
+    async def find_one_and_update(self, query, update, upsert=False, sort=None, return_document=None):
+        await asyncio.sleep(self.rtt)
+        document = self._find(query)
+        if document is None:
+            if not upsert:
+                return None
+            document = {key: value for key, value in query.items() if not key.startswith("$")}
+            self.documents.append(document)
+        self._update(document, update)
+        return dict(document)
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(self.rtt)
+        document = self._find(query)
+        if document is not None:
+            self._update(document, update)
+        return UpdateResult(1 if document is not None else 0)
+
+    async def delete_one(self, query):
+        await asyncio.sleep(self.rtt)
+        document = self._find(query)
+        if document is not None:
+            self.documents.remove(document)
+
+    async def list_indexes(self):
+        await asyncio.sleep(self.rtt)
+        for index in ():
+            yield index
+
+    async def create_indexes(self, models):
+        await asyncio.sleep(self.rtt)
+
+
+class FakeDatabase:
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.collections = {}
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection(self.rtt))
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def get_collection(self, name, write_concern=None):
+        return self[name]
+
+    def close(self):
+        pass
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, int(len(values) * fraction) - 1)]
+
+
+def send_inline(server):
+    """Swap the outbox for the senders awaited in the handler, as the app did before it."""
+    process_gift_card_submission = server.process_gift_card_submission
+
+    async def enqueue_nothing(db, reference_number):
+        pass
+
+    async def process_and_send(submission):
+        reference_number = await process_gift_card_submission(submission)
+        job = {"reference_number": reference_number}
+        await server.deliver_confirmation_email(job)
+        await server.deliver_internal_notification_email(job)
+        return reference_number
+
+    server.enqueue_submission_emails = enqueue_nothing
+    server.process_gift_card_submission = process_and_send
+
+
+async def run_mode(mode: str, requests: int, smtp_ms: float, rtt_ms: float):
+    # Imported here: the app reads its configuration (RUNTIME_PROFILE) at import
+    import httpx
+
+    import server
+    import smtp_pool
+
+    def blocking_send(self, msg):
+        time.sleep(smtp_ms / 1000)
+        return {"reused_connection": True, "tls_handshake_ms": None, "tls_resumed": False}
+
+    smtp_pool.SMTPConnectionPool.send_message = blocking_send
+    fake = FakeDatabase(rtt_ms / 1000)
+    server.db._client = server.db._database = fake
+
+    if mode == "inline":
+        send_inline(server)
+    # What the app's startup hooks would start (ASGITransport doesn't run them)
+    elif server.profile.background_workers:
+        await server.start_email_dispatcher()
+
+    emails = 2 * requests
+    latencies = []
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        for i in range(requests):
+            request_started = time.perf_counter()
+            # Identical payloads would otherwise be replayed as retries of the first
+            response = await client.post("/api/submit-gift-card", json=SUBMISSION, headers={"Idempotency-Key": f"bench-{i}"})
+            latencies.append((time.perf_counter() - request_started) * 1000)
+            assert response.json()["success"], response.text
+        submitted = time.perf_counter() - started
+
+        if mode == "inline":
+            delivery = "emails sent before each response"
+        elif server.profile.background_workers:
+            while server.email_dispatcher.sent < emails:
+                await asyncio.sleep(0.01)
+            delivery = f"last email sent {time.perf_counter() - started:.2f}s after the first submission (in-process dispatcher)"
+            server.email_dispatcher.stop()
+            await server.app.state.email_dispatcher_task
+        else:
+            runs = sent = 0
+            cron_seconds = 0.0
+            while sent < emails:
+                response = await client.get("/api/cron/deliver-emails", headers={"Authorization": f"Bearer {CRON_SECRET}"})
+                result = response.json()
+                assert result["sent"] > 0, result
+                runs += 1
+                sent += result["sent"]
+                cron_seconds += result["seconds"]
+            delivery = f"{runs} cron run(s) sent {sent} emails in {cron_seconds:.2f}s"
+
+    smtp_pool.shutdown_email_executor()
+    return latencies, submitted, delivery
+
+
+def child(mode: str, requests: int, smtp_ms: float, rtt_ms: float):
+    logging.disable(logging.WARNING)
+    # The app prints a few lines per email
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies, submitted, delivery = asyncio.run(run_mode(mode, requests, smtp_ms, rtt_ms))
+    print(
+        f"{mode:<11} p50 {statistics.median(latencies):7.1f} ms   p95 {percentile(latencies, 0.95):7.1f} ms   "
+        f"all {requests} submitted in {submitted:.2f}s; {delivery}"
+    )
+
+
+def main(requests: int, smtp_ms: float, rtt_ms: float):
+    print(f"{requests} submissions, {smtp_ms:.0f} ms per email, {rtt_ms:.0f} ms database round trip\n")
+    with tempfile.TemporaryDirectory() as blob_dir:
+        for mode in MODES:
+            env = dict(
+                os.environ,
+                RUNTIME_PROFILE="server" if mode == "inline" else mode,
+                MONGO_URL=os.environ.get("MONGO_URL", "mongodb://localhost:27017"),
+                DB_NAME="benchmark",
+                SMTP_SERVER="smtp.example.com",
+                SMTP_USERNAME="bench@example.com",
+                SMTP_PASSWORD="bench",
+                OPERATIONS_EMAIL="ops@example.com",
+                CRON_SECRET=CRON_SECRET,
+                BLOB_STORE_BACKEND="local",
+                BLOB_STORE_PATH=blob_dir,
+            )
+            subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(requests), str(smtp_ms), str(rtt_ms)],
+                env=env,
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        child(args[1], int(args[2]), float(args[3]), float(args[4]))
+    else:
+        main(
+            int(args[0]) if len(args) > 0 else 20,
+            float(args[1]) if len(args) > 1 else 500,
+            float(args[2]) if len(args) > 2 else 5,
+        )
@@ -0,0 +1,249 @@
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+
+from uploads import IMAGE_FIELDS
+
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage for uploaded images, keyed by the SHA-256 of the bytes.
+
+    The interface is synchronous like most object-store clients; async callers run it
+    with asyncio.to_thread. Storing identical bytes twice is a no-op, which dedupes
+    images re-uploaded across submissions.
+    """
+
+    name = "blob"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.puts = 0
+        self.dedupe_hits = 0
+        self.bytes_written = 0
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def write(self, key: str, data: bytes):
+        ...
+
+    @abstractmethod
+    def get(self, key: str) -> bytes:
+        ...
+
+    def put(self, data: bytes) -> str:
+        key = hashlib.sha256(data).hexdigest()
+        if self.exists(key):
+            with self._lock:
+                self.puts += 1
+                self.dedupe_hits += 1
+            return key
+        self.write(key, data)
+        with self._lock:
+            self.puts += 1
+            self.bytes_written += len(data)
+        return key
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "puts": self.puts,
+                "dedupe_hits": self.dedupe_hits,
+                "bytes_written": self.bytes_written,
+            }
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem backend: blobs live at <root>/<ab>/<cd>/<sha256>."""
+
+    name = "local"
+
+    def __init__(self, root):
+        super().__init__()
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).exists()
+
+    def write(self, key: str, data: bytes):
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def get(self, key: str) -> bytes:
+        return self.path_for(key).read_bytes()
+
+
+class MongoBlobStore(BlobStore):
+    """
+    MongoDB backend: one document per blob, {_id: <sha256>, data: <bytes>}.
+
+    The default, for deployments without a shared, persistent disk: serverless
+    functions (the instance that stores an image is rarely the one that later
+    attaches it to an email) and containers whose disk is replaced on every
+    redeploy. Normalized images are well under the 16 MB document limit. Uses a
+    synchronous pymongo client, created on first use, since the interface is sync.
+    """
+
+    name = "mongo"
+
+    def __init__(self, url: str, database: str, collection: str = "blobs", **client_options):
+        super().__init__()
+        self.url = url
+        self.database = database
+        self.collection_name = collection
+        self.client_options = client_options
+        self._collection = None
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    self._collection = MongoClient(self.url, **self.client_options)[self.database][self.collection_name]
+        return self._collection
+
+    def exists(self, key: str) -> bool:
+        return self.collection.find_one({"_id": key}, {"_id": 1}) is not None
+
+    def write(self, key: str, data: bytes):
+        try:
+            self.collection.insert_one({"_id": key, "data": data, "size": len(data)})
+        except DuplicateKeyError:
+            # Same bytes stored concurrently by another request
+            pass
+
+    def get(self, key: str) -> bytes:
+        blob = self.collection.find_one({"_id": key})
+        if blob is None:
+            raise FileNotFoundError(f"Blob {key} not found")
+        return bytes(blob["data"])
+
+
+_blob_store: Optional[BlobStore] = None
+_blob_store_lock = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """
+    The process-wide blob store, chosen by BLOB_STORE_BACKEND.
+
+    Defaults to Mongo: container disks on Railway and in the Docker image are
+    ephemeral, and the blob store holds the only copy of each card image. The
+    local backend needs BLOB_STORE_PATH pointing at a persistent volume, and is
+    the default when that is set.
+    """
+    global _blob_store
+    with _blob_store_lock:
+        if _blob_store is None:
+            root = os.environ.get('BLOB_STORE_PATH')
+            backend = os.environ.get('BLOB_STORE_BACKEND', 'local' if root else 'mongo').lower()
+            if backend == 'local':
+                if not root:
+                    raise ValueError("BLOB_STORE_BACKEND=local needs BLOB_STORE_PATH set to a persistent volume")
+                _blob_store = LocalBlobStore(root)
+            elif backend == 'mongo':
+                _blob_store = MongoBlobStore(
+                    os.environ['MONGO_URL'],
+                    os.environ['DB_NAME'],
+                    os.environ.get('BLOB_STORE_COLLECTION', 'blobs'),
+                    maxPoolSize=int(os.environ.get('BLOB_STORE_MAX_POOL_SIZE', 4)),
+                    serverSelectionTimeoutMS=int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5_000)),
+                )
+            else:
+                raise ValueError(f"Unsupported BLOB_STORE_BACKEND '{backend}'")
+        return _blob_store
+
+
+# Image payloads are base64 data URLs from the JSON endpoint or raw bytes from multipart
+def decode_image_data(image_data):
+    if isinstance(image_data, (bytes, bytearray)):
+        return bytes(image_data)
+    if image_data.startswith('data:'):
+        # Remove data URL prefix
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data)
+
+
+async def offload_image(store: BlobStore, image: dict, normalize=None) -> dict:
+    """
+    Move an uploaded image's bytes into the store, returning the reference kept in Mongo.
+
+    `normalize` is an optional async callable returning a re-encoded image and
+    thumbnail (see image_processing.normalize_image_async), or None to keep the
+    original bytes. A result whose "data" is None keeps the original bytes but
+    still records the dimensions and thumbnail.
+    """
+    # Decoding, hashing and writing multi-MB images is blocking work
+    data = await asyncio.to_thread(decode_image_data, image["data"])
+    reference = {
+        "name": image.get("name"),
+        "type": image.get("type") or "application/octet-stream",
+        "original_size": len(data),
+    }
+
+    normalized = await normalize(data) if normalize is not None else None
+    if normalized is not None:
+        # "data" is None when the original is already as small as it gets
+        if normalized["data"] is not None:
+            data = normalized["data"]
+            reference.update({
+                "name": Path(reference["name"] or "image").with_suffix(".jpg").name,
+                "type": normalized["type"],
+            })
+        thumbnail = normalized["thumbnail"]
+        reference.update({
+            "width": normalized["width"],
+            "height": normalized["height"],
+            "thumbnail": {
+                "type": "image/jpeg",
+                "size": len(thumbnail),
+                "sha256": await asyncio.to_thread(store.put, thumbnail),
+            },
+        })
+
+    reference["size"] = len(data)
+    reference["sha256"] = await asyncio.to_thread(store.put, data)
+    return reference
+
+
+async def offload_card_images(store: BlobStore, cards: list, normalize=None):
+    """Replace every inline card image with a blob reference, in place."""
+    for card in cards:
+        for field in IMAGE_FIELDS:
+            image = card.get(field)
+            if isinstance(image, dict) and image.get("data"):
+                card[field] = await offload_image(store, image, normalize)
+
+
+def load_image_bytes(store: BlobStore, image: dict) -> bytes:
+    """Bytes for a card image, whether it is a blob reference or still inline."""
+    if image.get("sha256"):
+        return store.get(image["sha256"])
+    return decode_image_data(image["data"])
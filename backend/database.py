@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from pymongo import monitoring
+
+from lazy_imports import lazy_import
+
+# Motor (and the Tornado/asyncio glue it loads) is only needed once the client is created
+motor_asyncio = lazy_import("motor.motor_asyncio")
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool utilization, fed by pymongo's pool events.
+
+    Events arrive on Motor's executor threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = {}
+        self.in_use = {}
+        self.peak_in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_seconds = 0.0
+        self.pool_clears = 0
+
+    def _adjust(self, counts: dict, address, delta: int):
+        counts[address] = counts.get(address, 0) + delta
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self._adjust(self.open, event.address, 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self._adjust(self.open, event.address, -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_seconds += event.duration or 0.0
+            self._adjust(self.in_use, event.address, 1)
+            self.peak_in_use = max(self.peak_in_use, sum(self.in_use.values()))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._adjust(self.in_use, event.address, -1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open": sum(self.open.values()),
+                "in_use": sum(self.in_use.values()),
+                "peak_in_use": self.peak_in_use,
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "average_checkout_wait_ms": round(self.checkout_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0,
+                "pool_clears": self.pool_clears,
+                "servers": {
+                    f"{host}:{port}": {"open": self.open.get((host, port), 0), "in_use": self.in_use.get((host, port), 0)}
+                    for host, port in self.open
+                },
+            }
+
+
+class Database:
+    """
+    The app's MongoDB database, connected on first use.
+
+    Importing the app never touches the network: the Motor client (and, for
+    mongodb+srv:// URLs, the DNS lookup its constructor does) is created the first
+    time a collection or command is used. Attribute and item access are passed
+    through to the Motor database, so `db.gift_card_submissions`, `db["counters"]`
+    and `db.command(...)` work as before.
+    """
+
+    def __init__(self, url: str, name: str, **client_options):
+        self.url = url
+        self.name = name
+        self.client_options = client_options
+        self.pool_stats = PoolStats()
+        self._client = None
+        self._database = None
+        self._lock = threading.Lock()
+        self.warmup_ping_ms: Optional[float] = None
+
+    @classmethod
+    def from_env(cls):
+        options = {
+            "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', 20)),
+            "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+            "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60_000)),
+            "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5_000)),
+            "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5_000)),
+            # Fail fast with an error instead of queueing forever when the pool is exhausted
+            "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10_000)),
+        }
+        if os.environ.get('MONGO_SOCKET_TIMEOUT_MS'):
+            options["socketTimeoutMS"] = int(os.environ['MONGO_SOCKET_TIMEOUT_MS'])
+        return cls(os.environ['MONGO_URL'], os.environ['DB_NAME'], **options)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = motor_asyncio.AsyncIOMotorClient(
+                        self.url, event_listeners=[self.pool_stats], **self.client_options
+                    )
+                    self._database = self._client[self.name]
+        return self._client
+
+    @property
+    def database(self):
+        if self._database is None:
+            self.client
+        return self._database
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+    def __getitem__(self, name):
+        return self.database[name]
+
+    def check_connection_budget(self):
+        """Warn when every worker filling its pool would exceed MONGO_CONNECTION_BUDGET (e.g. the Atlas tier limit)."""
+        budget = os.environ.get('MONGO_CONNECTION_BUDGET')
+        workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+        demand = workers * self.client_options["maxPoolSize"]
+        if budget and demand > int(budget):
+            logger.warning(
+                f"{workers} workers x maxPoolSize {self.client_options['maxPoolSize']} = {demand} connections "
+                f"per server exceeds MONGO_CONNECTION_BUDGET={budget}; lower MONGO_MAX_POOL_SIZE"
+            )
+
+    async def warm_up(self, connections: Optional[int] = None):
+        """
+        Connect and open `connections` pooled connections with concurrent pings, so
+        the first requests after startup don't pay for TCP + TLS + auth.
+        """
+        connections = connections or max(1, self.client_options["minPoolSize"])
+        started = time.perf_counter()
+        await asyncio.gather(*(self.database.command("ping") for _ in range(connections)))
+        self.warmup_ping_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"MongoDB ready: {connections} connection(s) warmed in {self.warmup_ping_ms} ms")
+
+    def stats(self) -> dict:
+        pool = self.pool_stats.snapshot()
+        return {
+            "connected": self._client is not None,
+            "max_pool_size": self.client_options["maxPoolSize"],
+            "min_pool_size": self.client_options["minPoolSize"],
+            "warmup_ping_ms": self.warmup_ping_ms,
+            # Busiest server's in-use connections as a share of its pool
+            "utilization": round(max((s["in_use"] for s in pool["servers"].values()), default=0) / self.client_options["maxPoolSize"], 3),
+            **pool,
+        }
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+
+
+_database: Optional[Database] = None
+
+
+def get_database() -> Database:
+    global _database
+    if _database is None:
+        _database = Database.from_env()
+    return _database
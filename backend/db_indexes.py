@@ -0,0 +1,137 @@
+import logging
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from pymongo import IndexModel
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+
+logger = logging.getLogger(__name__)
+
+# Duplicated keys reported when a unique index can't be built
+MAX_REPORTED_DUPLICATES = 20
+DUPLICATE_KEY_ERROR = 11000
+
+
+class IndexSpec(NamedTuple):
+    """One index the application relies on, as it should exist in Mongo."""
+    collection: str
+    keys: Sequence[Tuple[str, int]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+
+    def model(self) -> IndexModel:
+        options = {}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        # No explicit names: the generated ones (e.g. "reference_number_1") match
+        # indexes created by earlier create_index calls, so nothing is rebuilt
+        return IndexModel(list(self.keys), **options)
+
+    @property
+    def name(self) -> str:
+        return self.model().document["name"]
+
+
+async def find_duplicate_keys(db, collection: str, spec: IndexSpec, limit: int = MAX_REPORTED_DUPLICATES) -> List[dict]:
+    """The most repeated key values blocking a unique index, e.g. [{"reference_number": ..., "count": 2}]."""
+    fields = [field for field, _ in spec.keys]
+    pipeline = [
+        {"$group": {"_id": {field.replace(".", "_"): f"${field}" for field in fields}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+    ]
+    return [{**group["_id"], "count": group["count"]} async for group in db[collection].aggregate(pipeline, allowDiskUse=True)]
+
+
+async def ensure_collection_indexes(db, collection: str, specs: List[IndexSpec]) -> dict:
+    existing = {index["name"]: index async for index in db[collection].list_indexes()}
+    missing = [spec for spec in specs if spec.name not in existing]
+    report = {"created": [], "existing": [], "updated": [], "conflicts": [], "failed": []}
+
+    for spec in specs:
+        current = existing.get(spec.name)
+        if current is None:
+            continue
+        if spec.expire_after_seconds is not None and current.get("expireAfterSeconds") != spec.expire_after_seconds:
+            # A changed TTL is applied in place instead of failing with IndexOptionsConflict
+            await db.command("collMod", collection, index={"name": spec.name, "expireAfterSeconds": spec.expire_after_seconds})
+            report["updated"].append(spec.name)
+        elif spec.unique and not current.get("unique"):
+            # Cannot be fixed in place (and may not be fixable at all if the data
+            # already has duplicates); needs a manual drop and rebuild
+            logger.warning(f"{collection}.{spec.name} exists but is not unique")
+            report["conflicts"].append(spec.name)
+        else:
+            report["existing"].append(spec.name)
+
+    # Identical concurrent builds from other workers are fine: Mongo treats creating
+    # an index that already exists with the same options as a no-op
+    plain = [spec for spec in missing if not spec.unique]
+    if plain:
+        await db[collection].create_indexes([spec.model() for spec in plain])
+        report["created"].extend(spec.name for spec in plain)
+
+    # Unique indexes are built one at a time: existing data may violate one (legacy
+    # reference numbers repeat), and that must not take the other indexes with it
+    for spec in missing:
+        if not spec.unique:
+            continue
+        try:
+            await db[collection].create_indexes([spec.model()])
+        except OperationFailure as e:
+            failure = {"name": spec.name, "error": str(e)}
+            if e.code == DUPLICATE_KEY_ERROR:
+                failure["duplicates"] = await find_duplicate_keys(db, collection, spec)
+                logger.error(
+                    f"{collection}.{spec.name} not created, existing documents share keys; "
+                    f"clean these up and restart: {failure['duplicates']}"
+                )
+            else:
+                logger.error(f"{collection}.{spec.name} not created: {e}")
+            report["failed"].append(failure)
+            continue
+        report["created"].append(spec.name)
+    return report
+
+
+async def ensure_indexes(db, specs: Iterable[IndexSpec]) -> dict:
+    """
+    Make sure every declared index exists, one collection at a time.
+
+    Safe to run on every start and from every worker. A collection whose indexes
+    cannot be ensured is reported and logged without stopping the others (or the
+    app) from starting; so is a unique index the existing data violates, with the
+    duplicated keys to clean up. Returns a report with timings for /api/metrics.
+    """
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    started = time.perf_counter()
+    collections = {}
+    for collection, collection_specs in by_collection.items():
+        collection_started = time.perf_counter()
+        try:
+            report = await ensure_collection_indexes(db, collection, collection_specs)
+        except ConnectionFailure as e:
+            # Unreachable server: every other collection would wait out the same timeout
+            logger.warning(f"Could not ensure indexes, database unreachable: {e}")
+            collections[collection] = {"error": str(e)}
+            break
+        except Exception as e:
+            logger.warning(f"Could not ensure {collection} indexes: {e}")
+            report = {"error": str(e)}
+        report["seconds"] = round(time.perf_counter() - collection_started, 3)
+        collections[collection] = report
+        if report.get("created") or report.get("updated"):
+            logger.info(
+                f"{collection}: created {report['created']}, updated {report['updated']} in {report['seconds']:.3f}s"
+            )
+
+    total_seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Index bootstrap finished in {total_seconds:.3f}s")
+    return {"total_seconds": total_seconds, "collections": collections}
@@ -0,0 +1,288 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Union
+
+from pymongo import ASCENDING, ReturnDocument
+
+from db_indexes import IndexSpec
+
+
+# Job kinds written for every gift card submission
+CONFIRMATION_EMAIL = "confirmation"
+INTERNAL_NOTIFICATION_EMAIL = "internal_notification"
+SUBMISSION_EMAIL_KINDS = (CONFIRMATION_EMAIL, INTERNAL_NOTIFICATION_EMAIL)
+
+# Job statuses
+PENDING = "pending"
+SENDING = "sending"
+RETRY = "retry"
+SENT = "sent"
+FAILED = "failed"
+
+# Due-job claims scan status + next_attempt_at; lookups by submission use reference_number
+EMAIL_OUTBOX_INDEXES = (
+    IndexSpec("email_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+    IndexSpec("email_outbox", [("reference_number", ASCENDING)]),
+)
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_submission_emails(db, reference_number: str):
+    """Write the delivery jobs for a new submission to the email_outbox collection."""
+    now = utcnow()
+    jobs = [
+        {
+            "kind": kind,
+            "reference_number": reference_number,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "delivery": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for kind in SUBMISSION_EMAIL_KINDS
+    ]
+    await db.email_outbox.insert_many(jobs)
+
+
+async def cancel_submission_emails(db, reference_number: str):
+    """Withdraw the not yet claimed delivery jobs of a submission that was never stored."""
+    await db.email_outbox.delete_many({"reference_number": reference_number, "status": {"$in": [PENDING, RETRY]}})
+
+
+class EmailOutboxDispatcher:
+    """
+    Delivers email_outbox jobs with bounded concurrency.
+
+    Jobs are claimed in batches by taking a time-limited lease, so a worker that dies
+    mid-send only delays its jobs until the lease expires. A handler returning False
+    or raising schedules a retry with exponential backoff until max_attempts is hit.
+    A handler may return a dict describing the delivery instead of True (see
+    smtp_pool.SMTPConnectionPool.send_message); it is kept on the sent job.
+
+    With a supervisor (task_supervisor.TaskSupervisor), deliveries run as its jobs:
+    they count against its limit and are drained, not dropped, on shutdown.
+    """
+
+    def __init__(
+        self,
+        db,
+        handlers: Dict[str, Callable[[dict], Awaitable[Union[bool, dict]]]],
+        batch_size: int = 4,
+        lease_seconds: float = 120,
+        max_attempts: int = 6,
+        backoff_base_seconds: float = 30,
+        backoff_max_seconds: float = 3600,
+        poll_interval_seconds: float = 5,
+        supervisor=None,
+    ):
+        self.db = db
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.supervisor = supervisor
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._wake = asyncio.Event()
+        self._stopping = False
+
+        # Metrics
+        self.claimed = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, db, handlers, supervisor=None):
+        return cls(
+            db,
+            handlers,
+            supervisor=supervisor,
+            batch_size=int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 4)),
+            lease_seconds=float(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', 120)),
+            max_attempts=int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)),
+            backoff_base_seconds=float(os.environ.get('EMAIL_OUTBOX_BACKOFF_SECONDS', 30)),
+            poll_interval_seconds=float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', 5)),
+        )
+
+    def notify(self):
+        """Wake the dispatcher so freshly enqueued jobs go out without waiting for the next poll."""
+        self._wake.set()
+
+    async def claim_job(self):
+        now = utcnow()
+        return await self.db.email_outbox.find_one_and_update(
+            {
+                "$or": [
+                    {"status": {"$in": [PENDING, RETRY]}, "next_attempt_at": {"$lte": now}},
+                    # Lease ran out: the worker that claimed it died or stalled
+                    {"status": SENDING, "lease_expires_at": {"$lte": now}},
+                ]
+            },
+            {
+                "$set": {
+                    "status": SENDING,
+                    "lease_owner": self.worker_id,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def claim_batch(self):
+        jobs = []
+        while len(jobs) < self.batch_size:
+            job = await self.claim_job()
+            if job is None:
+                break
+            jobs.append(job)
+        self.claimed += len(jobs)
+        return jobs
+
+    def backoff_seconds(self, attempts: int) -> float:
+        delay = min(self.backoff_base_seconds * (2 ** (attempts - 1)), self.backoff_max_seconds)
+        # Jitter keeps retries from several workers from arriving in lockstep
+        return delay * random.uniform(0.8, 1.2)
+
+    async def deliver(self, job: dict):
+        handler = self.handlers.get(job["kind"])
+        error = None
+        try:
+            if handler is None:
+                error = f"No handler for email job kind '{job['kind']}'"
+                delivered = False
+            else:
+                delivered = await handler(job)
+                if not delivered:
+                    error = "Email handler reported failure"
+        except Exception as e:
+            delivered = False
+            error = str(e)
+
+        now = utcnow()
+        update = {"lease_owner": None, "lease_expires_at": None, "updated_at": now}
+        if delivered:
+            update.update({
+                "status": SENT,
+                "sent_at": now,
+                "last_error": None,
+                "delivery": delivered if isinstance(delivered, dict) else None,
+            })
+            self.sent += 1
+        elif job["attempts"] >= self.max_attempts or handler is None:
+            update.update({"status": FAILED, "last_error": error})
+            self.failed += 1
+            logging.error(f"Email job {job['kind']} for {job['reference_number']} failed permanently: {error}")
+        else:
+            next_attempt_at = now + timedelta(seconds=self.backoff_seconds(job["attempts"]))
+            update.update({"status": RETRY, "next_attempt_at": next_attempt_at, "last_error": error})
+            self.retried += 1
+            logging.warning(
+                f"Email job {job['kind']} for {job['reference_number']} failed "
+                f"(attempt {job['attempts']}), retrying at {next_attempt_at.isoformat()}: {error}"
+            )
+
+        await self.db.email_outbox.update_one(
+            {"_id": job["_id"], "lease_owner": self.worker_id},
+            {"$set": update},
+        )
+
+    async def release(self, job: dict):
+        """Give a claimed job back unattempted, due immediately."""
+        await self.db.email_outbox.update_one(
+            {"_id": job["_id"], "lease_owner": self.worker_id},
+            {
+                "$set": {"status": RETRY, "next_attempt_at": utcnow(), "lease_owner": None, "lease_expires_at": None},
+                "$inc": {"attempts": -1},
+            },
+        )
+        self.claimed -= 1
+
+    async def run_once(self) -> int:
+        jobs = await self.claim_batch()
+        if jobs and self._stopping:
+            # Stopped while claiming: nothing was sent, so hand the jobs straight back
+            await asyncio.gather(*(self.release(job) for job in jobs))
+            return 0
+        if jobs and self.supervisor is not None:
+            deliveries = [
+                self.supervisor.spawn(self.deliver(job), name=f"email:{job['kind']}:{job['reference_number']}")
+                for job in jobs
+            ]
+            # The supervisor logs failures. A delivery cancelled by a shutdown drain
+            # keeps its lease and is retried once it expires
+            await asyncio.gather(*deliveries, return_exceptions=True)
+        elif jobs:
+            await asyncio.gather(*(self.deliver(job) for job in jobs))
+        return len(jobs)
+
+    async def drain(self, time_budget_seconds: float = float("inf"), max_jobs: int = None) -> dict:
+        """
+        Deliver due jobs until none are left, max_jobs have been claimed or the time
+        budget has passed (checked between batches, so leave room for one batch under
+        a function timeout). For cron invocations and worker.py, where nothing runs
+        in the background between calls.
+        """
+        started = loop_time = time.monotonic()
+        claimed_before, sent_before, retried_before, failed_before = self.claimed, self.sent, self.retried, self.failed
+        while loop_time - started < time_budget_seconds and (max_jobs is None or self.claimed - claimed_before < max_jobs):
+            if await self.run_once() == 0:
+                break
+            loop_time = time.monotonic()
+        return {
+            "claimed": self.claimed - claimed_before,
+            "sent": self.sent - sent_before,
+            "retried": self.retried - retried_before,
+            "failed": self.failed - failed_before,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    async def run(self):
+        logging.info(f"Email outbox dispatcher started ({self.worker_id})")
+        while not self._stopping:
+            # Cleared before claiming so a notify() during the batch is not lost
+            self._wake.clear()
+            try:
+                processed = await self.run_once()
+            except Exception as e:
+                logging.error(f"Email outbox dispatcher error: {e}")
+                processed = 0
+
+            if processed == 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping = True
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "batch_size": self.batch_size,
+            "claimed": self.claimed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
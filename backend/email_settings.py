@@ -0,0 +1,96 @@
+import logging
+import os
+import ssl
+import threading
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class EmailSettings(BaseModel):
+    """SMTP and email routing configuration, parsed from the environment once."""
+    model_config = ConfigDict(frozen=True)
+
+    smtp_server: Optional[str] = None
+    smtp_port: int = 465
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_use_ssl: bool = True
+    tls_session_resumption: bool = True
+    operations_email: Optional[str] = None
+
+    pool_size: int = 3
+    pool_max_messages: int = 50
+    pool_keepalive_seconds: float = 30
+    pool_max_idle_seconds: float = 240
+    executor_threads: int = 3
+
+    @classmethod
+    def from_env(cls) -> "EmailSettings":
+        pool_size = int(os.environ.get('SMTP_POOL_SIZE', 3))
+        return cls(
+            smtp_server=os.environ.get('SMTP_SERVER'),
+            smtp_port=int(os.environ.get('SMTP_PORT', 465)),
+            smtp_username=os.environ.get('SMTP_USERNAME'),
+            smtp_password=os.environ.get('SMTP_PASSWORD'),
+            smtp_use_ssl=os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true',
+            tls_session_resumption=os.environ.get('SMTP_TLS_SESSION_RESUMPTION', 'true').lower() == 'true',
+            operations_email=os.environ.get('OPERATIONS_EMAIL'),
+            pool_size=pool_size,
+            pool_max_messages=int(os.environ.get('SMTP_POOL_MAX_MESSAGES', 50)),
+            pool_keepalive_seconds=float(os.environ.get('SMTP_POOL_KEEPALIVE_SECONDS', 30)),
+            pool_max_idle_seconds=float(os.environ.get('SMTP_POOL_MAX_IDLE_SECONDS', 240)),
+            executor_threads=int(os.environ.get('SMTP_EXECUTOR_THREADS', pool_size)),
+        )
+
+    @property
+    def smtp_configured(self) -> bool:
+        return bool(self.smtp_server and self.smtp_username and self.smtp_password)
+
+
+_settings: Optional[EmailSettings] = None
+_ssl_context: Optional[ssl.SSLContext] = None
+_settings_lock = threading.Lock()
+
+
+def get_email_settings() -> EmailSettings:
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = EmailSettings.from_env()
+    return _settings
+
+
+def get_ssl_context() -> ssl.SSLContext:
+    """
+    The client TLS context for every SMTP connection.
+
+    create_default_context() loads the system CA bundle from disk; building it once
+    and sharing it (SSLContext is safe to use from several threads) keeps that off
+    every connection.
+    """
+    global _ssl_context
+    if _ssl_context is None:
+        with _settings_lock:
+            if _ssl_context is None:
+                _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def reload_email_settings() -> bool:
+    """
+    Re-read the environment and rebuild the TLS context. Returns whether the
+    settings changed.
+
+    Only SMTP pools created afterwards use the new context (and so a rotated CA
+    bundle); the caller retires the live pool (see smtp_pool.close_smtp_pool).
+    """
+    global _settings, _ssl_context
+    settings = EmailSettings.from_env()
+    context = ssl.create_default_context()
+    with _settings_lock:
+        changed = settings != _settings
+        _settings, _ssl_context = settings, context
+    logging.info(f"Email settings reloaded ({'changed' if changed else 'unchanged'})")
+    return changed
@@ -1,78 +1,41 @@
-from fastapi import FastAPI, APIRouter
-from dotenv import load_dotenv
-from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-import logging
-from pathlib import Path
-from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
-import random
-import httpx
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import ssl
+import string
+from decimal import Decimal
 
-# Load environment variables
-load_dotenv()
+from models import CardCondition, CardType
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
-# Initialize FastAPI
-app = FastAPI(
-    title="Cashifygcmart API",
-    description="Gift Card Exchange Platform API",
-    version="1.0.0"
-)
+class CompiledTemplate:
+    """
+    An email template split into static text and named fields once, at import time.
 
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend domain
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    The source uses str.format syntax ({name} fields, {{ }} for literal braces).
+    Rendering fills the field slots of a copy of the pre-split chunk list and joins
+    it once, instead of re-interpolating the whole document per message.
+    """
 
-# Database setup
-db_client = None
-db = None
+    def __init__(self, source: str):
+        self.source = source
+        self.chunks = []
+        self.slots = []
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(source):
+            if literal:
+                self.chunks.append(literal)
+            if field_name is not None:
+                if not field_name.isidentifier() or format_spec or conversion:
+                    raise ValueError(f"Unsupported template field '{{{field_name}}}'")
+                self.slots.append((len(self.chunks), field_name))
+                self.chunks.append("")
+        self.fields = frozenset(name for _, name in self.slots)
 
-# Pydantic models
-class GiftCard(BaseModel):
-    brand: str
-    value: str
-    condition: str
-    hasReceipt: str
-    cardType: str
-    digitalCode: Optional[str] = ""
-    digitalPin: Optional[str] = ""
-    frontImage: Optional[dict] = None
-    backImage: Optional[dict] = None
-    receiptImage: Optional[dict] = None
+    def render(self, **values) -> str:
+        chunks = self.chunks.copy()
+        for index, name in self.slots:
+            chunks[index] = str(values[name])
+        return "".join(chunks)
 
-class GiftCardSubmission(BaseModel):
-    firstName: str
-    lastName: str
-    email: str
-    phoneNumber: str
-    cards: List[GiftCard]
-    paymentMethod: str
-    paypalAddress: Optional[str] = ""
-    zelleDetails: Optional[str] = ""
-    cashAppTag: Optional[str] = ""
-    btcAddress: Optional[str] = ""
-    chimeDetails: Optional[str] = ""
 
-# Email Template Functions
-def generate_confirmation_email_html(customer_name, reference_number):
-    return f"""
+# Customer confirmation email
+CONFIRMATION_TEMPLATE = CompiledTemplate("""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -358,9 +321,6 @@ def generate_confirmation_email_html(customer_name, reference_number):
             .footer {{
                 padding: 30px 20px;
             }}
-            .guideline-title {{
-                min-width: 120px;
-            }}
         }}
     </style>
 </head>
@@ -526,46 +486,11 @@ def generate_confirmation_email_html(customer_name, reference_number):
     </div>
 </body>
 </html>
-    """
+    """)
 
-def generate_internal_notification_email(customer_name, reference_number, submission_data):
-    cards_info = ""
-    total_value = 0
-    
-    for i, card in enumerate(submission_data.get('cards', []), 1):
-        card_value = float(card.get('value', 0)) if card.get('value', '').replace('.', '').isdigit() else 0
-        total_value += card_value
-        
-        # Simple card info without complex formatting
-        cards_info += f"""
-        Card {i}: {card.get('brand', 'N/A')} - Value: {card.get('value', '0')} - Condition: {card.get('condition', 'N/A').replace('-', ' ').title()}
-        Receipt: {"Yes" if card.get('hasReceipt') == 'yes' else "No"} - Type: {card.get('cardType', 'N/A').title()}"""
-        
-        # Add digital card details if it's a digital card
-        if card.get('cardType') == 'digital':
-            digital_code = card.get('digitalCode', 'N/A')
-            digital_pin = card.get('digitalPin', 'Not provided')
-            cards_info += f"""
-        Digital Code: {digital_code}
-        Digital PIN: {digital_pin}"""
-        
-        cards_info += "\n"
-    
-    # Payment method details
-    payment_method = submission_data.get('paymentMethod', '').upper()
-    payment_details = ""
-    if payment_method == 'PAYPAL':
-        payment_details = f"PayPal: {submission_data.get('paypalAddress', 'Not provided')}"
-    elif payment_method == 'ZELLE':
-        payment_details = f"Zelle: {submission_data.get('zelleDetails', 'Not provided')}"
-    elif payment_method == 'CASHAPP':
-        payment_details = f"Cash App: {submission_data.get('cashAppTag', 'Not provided')}"
-    elif payment_method == 'BTC':
-        payment_details = f"Bitcoin: {submission_data.get('btcAddress', 'Not provided')}"
-    elif payment_method == 'CHIME':
-        payment_details = f"Chime: {submission_data.get('chimeDetails', 'Not provided')}"
-    
-    return f"""
+
+# Internal notification email for the operations team
+INTERNAL_NOTIFICATION_TEMPLATE = CompiledTemplate("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -583,8 +508,8 @@ def generate_internal_notification_email(customer_name, reference_number, submis
         
         <h3 style="color: #374151; border-bottom: 2px solid #e5e7eb; padding-bottom: 5px;">Customer Information</h3>
         <p><strong>Name:</strong> {customer_name}</p>
-        <p><strong>Email:</strong> {submission_data.get('email', 'N/A')}</p>
-        <p><strong>Phone:</strong> {submission_data.get('phoneNumber', 'N/A')}</p>
+        <p><strong>Email:</strong> {email}</p>
+        <p><strong>Phone:</strong> {phone_number}</p>
         <p><strong>Payment Method:</strong> {payment_details}</p>
         
         <h3 style="color: #374151; border-bottom: 2px solid #e5e7eb; padding-bottom: 5px;">Gift Card Details</h3>
@@ -604,290 +529,81 @@ def generate_internal_notification_email(customer_name, reference_number, submis
         
         <hr style="margin: 30px 0;">
         <p style="font-size: 12px; color: #6b7280;">
-            Submission Date: {submission_data.get('submitted_at', 'N/A')}<br>
+            Submission Date: {submitted_at}<br>
             System: CashifyGCmart Internal Notification<br>
             From: noreply@cashifygcmart.com
         </p>
     </div>
 </body>
 </html>
-"""
+""")
 
-# Utility functions
-def generate_reference_number():
-    timestamp = datetime.now().strftime("%H%M%S")
-    random_num = random.randint(10, 99)
-    return f"GC-{timestamp}-{random_num}"
+CARD_LINE_TEMPLATE = CompiledTemplate("""
+        Card {index}: {brand} - Value: {value} - Condition: {condition}
+        Receipt: {receipt} - Type: {card_type}""")
 
-async def send_confirmation_email(email: str, customer_name: str, reference_number: str):
-    try:
-        # Get SMTP settings from environment
-        smtp_server = os.environ.get('SMTP_SERVER')
-        smtp_port = int(os.environ.get('SMTP_PORT', 465))
-        smtp_username = os.environ.get('SMTP_USERNAME')
-        smtp_password = os.environ.get('SMTP_PASSWORD')
-        use_ssl = os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true'
-        
-        if not all([smtp_server, smtp_username, smtp_password]):
-            print("ERROR: SMTP settings not found in environment variables")
-            return False
-        
-        # Generate email content
-        email_html = generate_confirmation_email_html(customer_name, reference_number)
-        subject = f"Gift Card Submission Confirmation - Reference #{reference_number}"
-        
-        # Create message
-        msg = MIMEMultipart('alternative')
-        msg['From'] = smtp_username
-        msg['To'] = email
-        msg['Subject'] = subject
-        
-        # Add HTML content
-        html_part = MIMEText(email_html, 'html')
-        msg.attach(html_part)
-        
-        # Send email via SMTP
-        if use_ssl:
-            # SSL connection
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as server:
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-        else:
-            # TLS connection
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls(context=ssl.create_default_context())
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-        
-        print(f"✅ Customer confirmation email sent to: {email}")
-        print(f"Reference Number: {reference_number}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ SMTP email sending failed: {e}")
-        return False
+DIGITAL_CARD_LINE_TEMPLATE = CompiledTemplate("""
+        Digital Code: {digital_code}
+        Digital PIN: {digital_pin}""")
 
-async def send_internal_notification_email(submission_data: dict, customer_name: str, reference_number: str):
-    try:
-        # Get SMTP settings from environment
-        smtp_server = os.environ.get('SMTP_SERVER')
-        smtp_port = int(os.environ.get('SMTP_PORT', 465))
-        smtp_username = os.environ.get('SMTP_USERNAME')
-        smtp_password = os.environ.get('SMTP_PASSWORD')
-        use_ssl = os.environ.get('SMTP_USE_SSL', 'true').lower() == 'true'
-        operations_email = os.environ.get('OPERATIONS_EMAIL')
-        
-        if not all([smtp_server, smtp_username, smtp_password, operations_email]):
-            print("ERROR: SMTP settings or operations email not found in environment variables")
-            return False
-        
-        # Generate email content
-        email_html = generate_internal_notification_email(customer_name, reference_number, submission_data)
-        subject = f"New Form Submission - Reference {reference_number} - {customer_name}"
-        
-        # Create message
-        msg = MIMEMultipart()
-        msg['From'] = smtp_username
-        msg['To'] = operations_email
-        msg['Subject'] = subject
-        
-        # Add HTML content
-        html_part = MIMEText(email_html, 'html')
-        msg.attach(html_part)
-        
-        # Process file attachments from uploaded images
-        attachment_count = 0
-        for i, card in enumerate(submission_data.get('cards', []), 1):
-            # Handle front image
-            if card.get('frontImage') and isinstance(card['frontImage'], dict):
-                if 'data' in card['frontImage'] and 'name' in card['frontImage']:
-                    try:
-                        # Decode base64 image data
-                        import base64
-                        image_data = card['frontImage']['data']
-                        if image_data.startswith('data:'):
-                            # Remove data URL prefix
-                            image_data = image_data.split(',')[1]
-                        
-                        # Decode base64
-                        decoded_data = base64.b64decode(image_data)
-                        
-                        # Create attachment
-                        attachment = MIMEBase('application', 'octet-stream')
-                        attachment.set_payload(decoded_data)
-                        encoders.encode_base64(attachment)
-                        attachment.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename=Card_{i}_Front_{card["frontImage"]["name"]}'
-                        )
-                        msg.attach(attachment)
-                        attachment_count += 1
-                    except Exception as e:
-                        print(f"Failed to attach front image for card {i}: {e}")
-            
-            # Handle back image
-            if card.get('backImage') and isinstance(card['backImage'], dict):
-                if 'data' in card['backImage'] and 'name' in card['backImage']:
-                    try:
-                        import base64
-                        image_data = card['backImage']['data']
-                        if image_data.startswith('data:'):
-                            image_data = image_data.split(',')[1]
-                        
-                        decoded_data = base64.b64decode(image_data)
-                        
-                        attachment = MIMEBase('application', 'octet-stream')
-                        attachment.set_payload(decoded_data)
-                        encoders.encode_base64(attachment)
-                        attachment.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename=Card_{i}_Back_{card["backImage"]["name"]}'
-                        )
-                        msg.attach(attachment)
-                        attachment_count += 1
-                    except Exception as e:
-                        print(f"Failed to attach back image for card {i}: {e}")
-            
-            # Handle receipt image
-            if card.get('receiptImage') and isinstance(card['receiptImage'], dict):
-                if 'data' in card['receiptImage'] and 'name' in card['receiptImage']:
-                    try:
-                        import base64
-                        image_data = card['receiptImage']['data']
-                        if image_data.startswith('data:'):
-                            image_data = image_data.split(',')[1]
-                        
-                        decoded_data = base64.b64decode(image_data)
-                        
-                        attachment = MIMEBase('application', 'octet-stream')
-                        attachment.set_payload(decoded_data)
-                        encoders.encode_base64(attachment)
-                        attachment.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename=Card_{i}_Receipt_{card["receiptImage"]["name"]}'
-                        )
-                        msg.attach(attachment)
-                        attachment_count += 1
-                    except Exception as e:
-                        print(f"Failed to attach receipt image for card {i}: {e}")
-        
-        # Send email via SMTP
-        if use_ssl:
-            # SSL connection
-            context = ssl.create_default_context()
-            with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as server:
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-        else:
-            # TLS connection
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls(context=ssl.create_default_context())
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
-        
-        print(f"✅ Internal notification email sent to: {operations_email}")
-        print(f"📎 Attachments included: {attachment_count}")
-        print(f"Reference Number: {reference_number}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ SMTP internal email sending failed: {e}")
-        return False
+# Stored card values -> email labels, looked up per card instead of rebuilding enums
+CONDITION_LABELS = {condition.value: condition.label for condition in CardCondition}
+CARD_TYPE_LABELS = {card_type.value: card_type.value.title() for card_type in CardType}
 
-# API Router
-api_router = APIRouter(prefix="/api")
+# Payment method -> (label, submission field holding the payout details)
+PAYMENT_DETAIL_FIELDS = {
+    'PAYPAL': ("PayPal", 'paypalAddress'),
+    'ZELLE': ("Zelle", 'zelleDetails'),
+    'CASHAPP': ("Cash App", 'cashAppTag'),
+    'BTC': ("Bitcoin", 'btcAddress'),
+    'CHIME': ("Chime", 'chimeDetails'),
+}
 
-@api_router.get("/")
-async def root():
-    return {"message": "Cashifygcmart API is running"}
 
-@api_router.post("/submit-gift-card")
-async def submit_gift_card(submission: GiftCardSubmission):
-    try:
-        # Generate reference number
-        reference_number = generate_reference_number()
-        
-        # Add timestamp to submission data
-        submission_dict = submission.dict()
-        submission_dict['reference_number'] = reference_number
-        submission_dict['submitted_at'] = datetime.now().isoformat()
-        
-        # Store in database (if available)
-        customer_email_sent = False
-        internal_email_sent = False
-        
-        try:
-            if db:
-                await db.gift_card_submissions.insert_one(submission_dict)
-                print(f"✅ Submission stored in database: {reference_number}")
-        except Exception as e:
-            print(f"⚠️ Database storage failed (continuing anyway): {e}")
-        
-        # Send confirmation email to customer
-        try:
-            customer_name = f"{submission.firstName} {submission.lastName}"
-            customer_email_sent = await send_confirmation_email(
-                submission.email, 
-                customer_name, 
-                reference_number
-            )
-        except Exception as e:
-            print(f"❌ Customer email failed: {e}")
-        
-        # Send internal notification email
-        try:
-            customer_name = f"{submission.firstName} {submission.lastName}"
-            internal_email_sent = await send_internal_notification_email(
-                submission_dict, 
-                customer_name, 
-                reference_number
-            )
-        except Exception as e:
-            print(f"❌ Internal email failed: {e}")
-        
-        return {
-            "success": True,
-            "reference_number": reference_number,
-            "message": "Gift card submission received successfully",
-            "customer_email_sent": customer_email_sent,
-            "internal_email_sent": internal_email_sent
-        }
-        
-    except Exception as e:
-        print(f"❌ Submission processing failed: {e}")
-        return {
-            "success": False,
-            "message": f"Submission failed: {str(e)}"
-        }
+def generate_confirmation_email_html(customer_name, reference_number):
+    return CONFIRMATION_TEMPLATE.render(customer_name=customer_name, reference_number=reference_number)
 
-# Include API router
-app.include_router(api_router)
 
-# Database connection events
-@app.on_event("startup")
-async def startup_db_client():
-    global db_client, db
-    try:
-        mongo_url = os.environ.get('MONGO_URL')
-        db_name = os.environ.get('DB_NAME', 'cashifygcmart')
+def generate_internal_notification_email(customer_name, reference_number, submission_data):
+    # Stored cards were validated at ingress (models.GiftCard) and hold canonical
+    # strings, so they are rendered as they are rather than rebuilt into models
+    card_chunks = []
+    total_value = Decimal(0)
+    
+    for i, card in enumerate(submission_data['cards'], 1):
+        total_value += Decimal(card['value'])
+        card_chunks.append(CARD_LINE_TEMPLATE.render(
+            index=i,
+            brand=card['brand'],
+            value=card['value'],
+            condition=CONDITION_LABELS[card['condition']],
+            receipt="Yes" if card['hasReceipt'] == 'yes' else "No",
+            card_type=CARD_TYPE_LABELS[card['cardType']],
+        ))
         
-        if mongo_url:
-            db_client = AsyncIOMotorClient(mongo_url)
-            db = db_client[db_name]
-            print(f"✅ Connected to MongoDB: {db_name}")
-        else:
-            print("⚠️ No MONGO_URL found - running without database")
-    except Exception as e:
-        print(f"❌ Database connection failed: {e}")
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    if db_client:
-        db_client.close()
-        print("✅ Database connection closed")
-
-# Remove uvicorn startup code - Vercel handles this
-# if __name__ == "__main__":
-#     import uvicorn
-#     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+        # Add digital card details if it's a digital card
+        if card['cardType'] == CardType.DIGITAL.value:
+            card_chunks.append(DIGITAL_CARD_LINE_TEMPLATE.render(
+                digital_code=card.get('digitalCode') or 'N/A',
+                digital_pin=card.get('digitalPin') or 'Not provided',
+            ))
+        
+        card_chunks.append("\n")
+    
+    # Payment method details
+    payment_details = ""
+    payment_method = PAYMENT_DETAIL_FIELDS.get(submission_data.get('paymentMethod', '').upper())
+    if payment_method:
+        label, field = payment_method
+        payment_details = f"{label}: {submission_data.get(field, 'Not provided')}"
+    
+    return INTERNAL_NOTIFICATION_TEMPLATE.render(
+        reference_number=reference_number,
+        customer_name=customer_name,
+        email=submission_data.get('email', 'N/A'),
+        phone_number=submission_data.get('phoneNumber', 'N/A'),
+        payment_details=payment_details,
+        cards_info="".join(card_chunks),
+        total_value=f"{total_value:.2f}",
+        submitted_at=submission_data.get('submitted_at', 'N/A'),
+    )
@@ -0,0 +1,141 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import IndexSpec
+
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+class IdempotencyConflict(Exception):
+    """A request with the same key is still being processed."""
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different payload."""
+
+
+def payload_fingerprint(payload) -> str:
+    """
+    SHA-256 over a canonical walk of the payload.
+
+    Used as the idempotency key when the client sends no Idempotency-Key header.
+    Dict keys are visited in sorted order and raw image bytes are hashed directly,
+    so JSON and multipart submissions of the same content produce stable keys
+    without serializing the whole payload first.
+    """
+    hasher = hashlib.sha256()
+
+    def feed(value):
+        if isinstance(value, BaseModel):
+            value = dict(value)
+        if isinstance(value, dict):
+            hasher.update(b"{")
+            for key in sorted(value):
+                hasher.update(str(key).encode() + b":")
+                feed(value[key])
+            hasher.update(b"}")
+        elif isinstance(value, (list, tuple)):
+            hasher.update(b"[")
+            for item in value:
+                feed(item)
+            hasher.update(b"]")
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            hasher.update(b"b%d:" % len(value))
+            hasher.update(value)
+        else:
+            text = repr(value).encode()
+            hasher.update(b"s%d:" % len(text))
+            hasher.update(text)
+
+    feed(payload)
+    return hasher.hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Mongo-backed record of submission keys and the responses they produced.
+
+    A key is claimed by inserting it (the unique _id makes concurrent retries race
+    safely); replays of a completed key get the stored response back, and keys
+    expire through a TTL index on created_at.
+    """
+
+    def __init__(self, db, scope: str, ttl_seconds: int, stale_after_seconds: int = 300):
+        self.db = db
+        self.scope = scope
+        self.ttl_seconds = ttl_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self.replays = 0
+
+    @classmethod
+    def from_env(cls, db, scope: str):
+        return cls(db, scope, int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 3600)))
+
+    def indexes(self):
+        # Keys expire through a TTL index on created_at
+        return [IndexSpec("idempotency_keys", [("created_at", 1)], expire_after_seconds=self.ttl_seconds)]
+
+    def _id(self, key: str) -> str:
+        return f"{self.scope}:{key}"
+
+    async def begin(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Claim key for the payload with this fingerprint (see payload_fingerprint),
+        or return the stored response if it already completed.
+
+        A key is bound to the payload it was first used with: reusing it for a
+        different one raises IdempotencyKeyReused rather than replaying a response
+        that belongs to another submission.
+        """
+        try:
+            await self.db.idempotency_keys.insert_one({
+                "_id": self._id(key),
+                "status": IN_PROGRESS,
+                "fingerprint": fingerprint,
+                "created_at": datetime.now(timezone.utc),
+            })
+            return None
+        except DuplicateKeyError:
+            existing = await self.db.idempotency_keys.find_one({"_id": self._id(key)})
+            if existing is None:
+                # Expired between the insert and the read; claim it again
+                return await self.begin(key, fingerprint)
+            # Keys claimed before fingerprints were stored have none to compare
+            if existing.get("fingerprint", fingerprint) != fingerprint:
+                raise IdempotencyKeyReused(key)
+            if existing["status"] != COMPLETED:
+                # The request that claimed it died mid-flight; take the key over
+                if await self._take_over_stale(existing):
+                    return None
+                raise IdempotencyConflict(key)
+            self.replays += 1
+            return existing["response"]
+
+    async def _take_over_stale(self, existing: dict) -> bool:
+        claimed_at = existing["created_at"]
+        if claimed_at.tzinfo is None:
+            claimed_at = claimed_at.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - claimed_at).total_seconds() < self.stale_after_seconds:
+            return False
+        result = await self.db.idempotency_keys.update_one(
+            {"_id": existing["_id"], "status": IN_PROGRESS, "created_at": existing["created_at"]},
+            {"$set": {"created_at": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count == 1
+
+    async def complete(self, key: str, response: dict):
+        await self.db.idempotency_keys.update_one(
+            {"_id": self._id(key)},
+            {"$set": {"status": COMPLETED, "response": response, "completed_at": datetime.now(timezone.utc)}},
+        )
+
+    async def release(self, key: str):
+        """Forget a key whose request failed so the client can retry it."""
+        await self.db.idempotency_keys.delete_one({"_id": self._id(key), "status": IN_PROGRESS})
@@ -0,0 +1,147 @@
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow missing: images are stored exactly as uploaded
+    Image = None
+
+
+MAX_DIMENSION = int(os.environ.get('IMAGE_MAX_DIMENSION', 2000))
+JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 82))
+THUMBNAIL_DIMENSION = int(os.environ.get('IMAGE_THUMBNAIL_DIMENSION', 320))
+# Refuse to decode anything larger than this many pixels (decompression bombs)
+MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 60_000_000))
+
+
+def _encode_jpeg(image, quality: int) -> bytes:
+    out = io.BytesIO()
+    # No exif/icc arguments: the re-encoded file carries no metadata
+    image.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def normalize_image(data: bytes, max_dimension: int, quality: int, thumbnail_dimension: int) -> Optional[dict]:
+    """
+    Decode an uploaded image, cap its dimensions, strip metadata and re-encode to JPEG.
+
+    Runs on the image executor, usually in a worker process. Returns None when the
+    bytes are not an image Pillow can decode (e.g. a PDF receipt), in which case
+    the original is kept. "data" is also None when the original already fits
+    max_dimension, carries no EXIF or XMP metadata and is no bigger than the
+    re-encoded JPEG (small PNGs): the original is kept then too, with the
+    dimensions and thumbnail still reported.
+    """
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            # Before draft(), which may already decode a large JPEG scaled down
+            fits = max(source.size) <= max_dimension
+            has_metadata = bool(source.getexif()) or "xmp" in source.info
+            source.draft("RGB", (max_dimension, max_dimension))
+            # Bake in the EXIF orientation before the metadata is dropped
+            image = ImageOps.exif_transpose(source)
+            if image.mode in ("RGBA", "LA", "P"):
+                image = image.convert("RGBA")
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.getchannel("A"))
+                image = background
+            elif image.mode != "RGB":
+                image = image.convert("RGB")
+
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            normalized = _encode_jpeg(image, quality)
+            if fits and not has_metadata and len(normalized) >= len(data):
+                normalized = None
+
+            thumbnail = image.copy()
+            thumbnail.thumbnail((thumbnail_dimension, thumbnail_dimension), Image.Resampling.LANCZOS)
+            return {
+                "data": normalized,
+                "type": "image/jpeg" if normalized is not None else None,
+                "width": image.width,
+                "height": image.height,
+                "thumbnail": _encode_jpeg(thumbnail, quality),
+            }
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+_image_executor: Optional[Executor] = None
+_image_executor_lock = threading.Lock()
+
+
+def get_image_executor(use_processes: bool = True) -> Executor:
+    """
+    The shared image executor, created on first use: a process pool, or a thread
+    pool where worker processes aren't available (serverless functions). Pillow
+    releases the GIL while decoding, resizing and encoding, so threads still keep
+    the event loop responsive.
+    """
+    global _image_executor
+    with _image_executor_lock:
+        if _image_executor is None:
+            workers = int(os.environ.get('IMAGE_WORKERS', min(2, os.cpu_count() or 1)))
+            if use_processes:
+                _image_executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _image_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+        return _image_executor
+
+
+def _replace_broken_executor(broken: Executor):
+    global _image_executor
+    with _image_executor_lock:
+        # Concurrent callers see the same broken pool; only the first replaces it
+        if _image_executor is broken:
+            _image_executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def normalize_image_async(data: bytes, use_processes: bool = True) -> Optional[dict]:
+    """
+    Normalize on the image executor so decoding never blocks the event loop.
+
+    A worker dying mid-decode (e.g. OOM-killed on an image near IMAGE_MAX_PIXELS)
+    breaks the whole process pool; it is replaced for the next image, and this one
+    is stored as uploaded rather than failing the submission.
+    """
+    if Image is None:
+        return None
+    loop = asyncio.get_running_loop()
+    executor = get_image_executor(use_processes)
+    try:
+        normalized = await loop.run_in_executor(
+            executor, normalize_image, data, MAX_DIMENSION, JPEG_QUALITY, THUMBNAIL_DIMENSION
+        )
+    except BrokenProcessPool:
+        logging.error(f"Image worker process died; restarting the image pool and keeping the original {len(data)} byte image")
+        _replace_broken_executor(executor)
+        return None
+    if normalized is not None:
+        if normalized["data"] is None:
+            logging.info(f"Image kept as uploaded: {len(data)} bytes, re-encoding would not shrink it")
+        else:
+            logging.info(
+                f"Image normalized: {len(data)} -> {len(normalized['data'])} bytes "
+                f"({normalized['width']}x{normalized['height']})"
+            )
+    return normalized
+
+
+def shutdown_image_executor():
+    global _image_executor
+    with _image_executor_lock:
+        executor, _image_executor = _image_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+if Image is None:
+    logging.warning("Pillow is not installed; uploaded images will be stored without normalization")
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Iterable
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    The module `name`, executed on first attribute access instead of now.
+
+    For dependencies only some requests need (SMTP, MIME, Pillow...): a serverless
+    cold start that never sends an email never pays for importing them. Once
+    loaded it is the ordinary module object, so later `import name` and
+    monkeypatching its attributes behave as usual.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def preload(modules: Iterable[ModuleType]):
+    """Finish loading lazily imported modules now, e.g. at server startup rather than on the first request."""
+    for module in modules:
+        # Any attribute access runs a pending lazy load
+        getattr(module, "__name__")
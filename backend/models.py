@@ -0,0 +1,126 @@
+from decimal import Decimal
+from enum import Enum
+from typing import List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, StrictBytes, StrictStr, field_validator
+
+from uploads import IMAGE_FIELDS, MAX_CARDS, MAX_IMAGE_BYTES
+
+
+class CardCondition(str, Enum):
+    NEW = "new"
+    PARTIALLY_USED = "partially-used"
+
+    @property
+    def label(self) -> str:
+        return self.value.replace("-", " ").title()
+
+
+class CardType(str, Enum):
+    PHYSICAL = "physical"
+    DIGITAL = "digital"
+
+
+class CardImage(BaseModel):
+    """An uploaded card image: a base64 data URL (JSON body) or raw bytes (multipart part)."""
+    model_config = ConfigDict(extra="forbid")
+
+    name: str = Field("", max_length=255)
+    type: str = Field("", max_length=100)
+    size: Optional[int] = Field(None, ge=0)
+    # Strict members: a lax Union[bytes, str] tries str -> bytes coercion first,
+    # encoding (copying) every multi-MB data URL during validation
+    data: Union[StrictStr, StrictBytes] = Field(min_length=1)
+
+    @field_validator("data")
+    @classmethod
+    def check_decoded_size(cls, data):
+        if isinstance(data, str):
+            # Estimated from the base64 length, without decoding (copying) it
+            start = data.find(",") + 1 if data.startswith("data:") else 0
+            size = (len(data) - start) * 3 // 4
+        else:
+            size = len(data)
+        if size > MAX_IMAGE_BYTES:
+            raise ValueError(f"image is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+        return data
+
+    def to_document(self) -> dict:
+        return {"name": self.name, "type": self.type, "size": self.size, "data": self.data}
+
+
+class GiftCard(BaseModel):
+    """
+    One gift card as submitted by the form.
+
+    Validated once at ingress; everything downstream never re-checks types or
+    formats. Documents are built from the attributes, and emails are rendered
+    from the canonical strings the document stores.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    brand: str = Field(min_length=1, max_length=100)
+    value: Decimal = Field(gt=0, max_digits=10, decimal_places=2, allow_inf_nan=False)
+    condition: CardCondition
+    hasReceipt: Literal["yes", "no"]
+    cardType: CardType
+    digitalCode: Optional[str] = Field("", max_length=200)
+    digitalPin: Optional[str] = Field("", max_length=50)
+    frontImage: Optional[CardImage] = None
+    backImage: Optional[CardImage] = None
+    receiptImage: Optional[CardImage] = None
+
+    def to_document(self) -> dict:
+        document = {
+            "brand": self.brand,
+            # Stored as a plain decimal string, as it always has been
+            "value": format(self.value, "f"),
+            "condition": self.condition.value,
+            "hasReceipt": self.hasReceipt,
+            "cardType": self.cardType.value,
+            "digitalCode": self.digitalCode or "",
+            "digitalPin": self.digitalPin or "",
+        }
+        for field in IMAGE_FIELDS:
+            image = getattr(self, field)
+            document[field] = image.to_document() if image is not None else None
+        return document
+
+
+class GiftCardSubmission(BaseModel):
+    # Personal Information
+    firstName: str
+    lastName: str
+    email: str
+    phoneNumber: Optional[str] = ""
+
+    # Gift Card Details
+    cards: List[GiftCard] = Field(min_length=1, max_length=MAX_CARDS)
+
+    # Payment Information
+    paymentMethod: str
+    paypalAddress: Optional[str] = ""
+    zelleDetails: Optional[str] = ""
+    cashAppTag: Optional[str] = ""
+    btcAddress: Optional[str] = ""
+    chimeDetails: Optional[str] = ""
+
+    def to_document(self) -> dict:
+        """
+        The Mongo document for this submission, built straight from the validated
+        attributes. Image data is referenced, not copied, until it is offloaded to
+        the blob store.
+        """
+        return {
+            "firstName": self.firstName,
+            "lastName": self.lastName,
+            "email": self.email,
+            "phoneNumber": self.phoneNumber,
+            "cards": [card.to_document() for card in self.cards],
+            "paymentMethod": self.paymentMethod,
+            "paypalAddress": self.paypalAddress,
+            "zelleDetails": self.zelleDetails,
+            "cashAppTag": self.cashAppTag,
+            "btcAddress": self.btcAddress,
+            "chimeDetails": self.chimeDetails,
+        }
@@ -0,0 +1,68 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from pymongo import ReturnDocument
+
+
+# Counter document in the "counters" collection backing gift card references
+REFERENCE_COUNTER = "gift_card_reference"
+
+
+def mongo_counter(db, name: str = REFERENCE_COUNTER) -> Callable[[int], Awaitable[int]]:
+    """Atomically reserve `count` sequence numbers, returning the last one reserved."""
+    async def reserve(count: int) -> int:
+        counter = await db.counters.find_one_and_update(
+            {"_id": name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return counter["seq"]
+    return reserve
+
+
+class ReferenceNumberAllocator:
+    """
+    Collision-free reference numbers of the form GC-YYMMDD-NNNNNNN.
+
+    The sequence number is unique across every process: each allocator reserves a
+    block of numbers from a shared atomic counter and hands them out locally, so the
+    counter is only touched once per block. Numbers left in a block when a worker
+    exits are skipped, never reused. The date part is informational only.
+    """
+
+    def __init__(self, reserve: Callable[[int], Awaitable[int]], block_size: int = 20):
+        self.reserve = reserve
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+        self.blocks_reserved = 0
+
+    async def next_sequence(self) -> int:
+        async with self._lock:
+            if self._next >= self._end:
+                last = await self.reserve(self.block_size)
+                self._next = last - self.block_size + 1
+                self._end = last + 1
+                self.blocks_reserved += 1
+            sequence = self._next
+            self._next += 1
+            return sequence
+
+    @staticmethod
+    def format(sequence: int, now: datetime = None) -> str:
+        now = now or datetime.now(timezone.utc)
+        return f"GC-{now:%y%m%d}-{sequence:07d}"
+
+    async def next_reference(self) -> str:
+        return self.format(await self.next_sequence())
+
+
+def allocator_from_env(db) -> ReferenceNumberAllocator:
+    return ReferenceNumberAllocator(
+        mongo_counter(db),
+        block_size=int(os.environ.get('REFERENCE_BLOCK_SIZE', 20)),
+    )
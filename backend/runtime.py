@@ -0,0 +1,72 @@
+import os
+import threading
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class RuntimeProfile(BaseModel):
+    """
+    How the app runs: which background work it starts and what it does at startup.
+
+    `server` is a long-running process (uvicorn on Railway or the Docker image):
+    the email outbox dispatcher and SMTP keepalive run in the background, Mongo
+    connections are warmed and indexes ensured at startup, and inserts are batched.
+
+    `serverless` is a function instance (Vercel) that may be frozen between
+    requests and killed at any time: nothing runs in the background, startup does
+    no I/O, inserts are written as they come, images are normalized on a thread
+    instead of a worker process, and email jobs are delivered by the cron-invoked
+    /api/cron/deliver-emails (or worker.py).
+    """
+    model_config = ConfigDict(frozen=True)
+
+    name: str
+    background_workers: bool
+    warm_up_database: bool
+    ensure_indexes_at_startup: bool
+    batch_inserts: bool
+    # Load lazily imported modules (SMTP, MIME, Pillow) at startup instead of on first use
+    preload_modules: bool
+    # Normalize images on a process pool rather than threads. Function sandboxes
+    # generally lack the /dev/shm semaphores multiprocessing needs, and spawning
+    # workers inside an instance works against a short cold start
+    image_process_pool: bool
+
+
+PROFILES = {
+    "server": RuntimeProfile(
+        name="server",
+        background_workers=True,
+        warm_up_database=True,
+        ensure_indexes_at_startup=True,
+        batch_inserts=True,
+        preload_modules=True,
+        image_process_pool=True,
+    ),
+    "serverless": RuntimeProfile(
+        name="serverless",
+        background_workers=False,
+        warm_up_database=False,
+        ensure_indexes_at_startup=False,
+        batch_inserts=False,
+        preload_modules=False,
+        image_process_pool=False,
+    ),
+}
+
+_profile: Optional[RuntimeProfile] = None
+_profile_lock = threading.Lock()
+
+
+def get_runtime_profile() -> RuntimeProfile:
+    """RUNTIME_PROFILE if set, otherwise `serverless` on Vercel (which sets VERCEL=1) and `server` elsewhere."""
+    global _profile
+    if _profile is None:
+        with _profile_lock:
+            if _profile is None:
+                name = os.environ.get('RUNTIME_PROFILE') or ('serverless' if os.environ.get('VERCEL') else 'server')
+                if name.lower() not in PROFILES:
+                    raise ValueError(f"Unknown RUNTIME_PROFILE '{name}', expected one of {sorted(PROFILES)}")
+                _profile = PROFILES[name.lower()]
+    return _profile
@@ -0,0 +1,465 @@
+import asyncio
+import copy
+import functools
+import logging
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.generator import BytesGenerator
+from email.utils import getaddresses
+from typing import Optional
+
+from email_settings import get_email_settings, get_ssl_context
+
+
+# Errors that mean the connection itself is unusable and should be replaced
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, ssl.SSLError)
+
+
+class DotStuffingWriter:
+    """
+    File-like sink that streams a message into the SMTP DATA phase.
+
+    Applies RFC 5321 dot-stuffing as bytes arrive and flushes to the socket in
+    fixed-size chunks, so the flattened message never exists as one buffer.
+    """
+
+    def __init__(self, sock, chunk_size: int = 64 * 1024):
+        self.sock = sock
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.at_line_start = True
+        self.bytes_sent = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode("ascii")
+        if not data:
+            return
+        if self.at_line_start and data[:1] == b".":
+            self.buffer += b"."
+        self.buffer += data.replace(b"\n.", b"\n..")
+        self.at_line_start = data.endswith(b"\n")
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.sock.sendall(self.buffer)
+            self.bytes_sent += len(self.buffer)
+            self.buffer = bytearray()
+
+    def finish(self):
+        if not self.at_line_start:
+            self.buffer += b"\r\n"
+        self.buffer += b".\r\n"
+        self.flush()
+
+
+def write_message(fp, msg, policy):
+    """
+    Serialize msg to fp part by part, producing the same bytes as BytesGenerator.
+
+    BytesGenerator renders every subpart of a multipart message into a buffer and
+    only then writes them out, so the whole message is held in memory at once. This
+    writes multipart containers incrementally, so at most one leaf part is buffered.
+    """
+    if not msg.is_multipart():
+        BytesGenerator(fp, mangle_from_=False, policy=policy).flatten(msg)
+        return
+
+    linesep = policy.linesep
+    if msg.get_boundary() is None:
+        msg.set_boundary(f"==============={uuid.uuid4().hex}==")
+    boundary = msg.get_boundary()
+
+    for name, value in msg.raw_items():
+        fp.write(policy.fold_binary(name, value))
+    fp.write(linesep)
+    if msg.preamble is not None:
+        fp.write(linesep.join(msg.preamble.splitlines()) + linesep)
+    for index, part in enumerate(msg.get_payload()):
+        fp.write(("" if index == 0 else linesep) + f"--{boundary}{linesep}")
+        write_message(fp, part, policy)
+    fp.write(f"{linesep}--{boundary}--{linesep}")
+    if msg.epilogue is not None:
+        fp.write(linesep.join(msg.epilogue.splitlines()))
+
+
+def stream_message(smtp: smtplib.SMTP, msg) -> int:
+    """
+    Send msg like SMTP.send_message, but generate it straight onto the socket.
+
+    smtplib flattens the whole message to bytes, then copies it again for
+    dot-stuffing and line-ending fixes; with multi-MB attachments that is several
+    full copies per email. Returns the number of bytes sent in the DATA phase.
+    """
+    from_addr = msg["Sender"] or msg["From"]
+    to_addrs = [addr for _, addr in getaddresses(msg.get_all("To", []) + msg.get_all("Cc", []) + msg.get_all("Bcc", []))]
+
+    smtp.ehlo_or_helo_if_needed()
+    code, resp = smtp.mail(from_addr)
+    if code != 250:
+        smtp.rset()
+        raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+    refused = {}
+    for addr in to_addrs:
+        code, resp = smtp.rcpt(addr)
+        if code not in (250, 251):
+            refused[addr] = (code, resp)
+    if len(refused) == len(to_addrs):
+        smtp.rset()
+        raise smtplib.SMTPRecipientsRefused(refused)
+
+    code, resp = smtp.docmd("data")
+    if code != 354:
+        smtp.rset()
+        raise smtplib.SMTPDataError(code, resp)
+
+    # Bcc must not be transmitted; copy only the header list, not the parts
+    if msg.get_all("Bcc"):
+        msg = copy.copy(msg)
+        del msg["Bcc"]
+    writer = DotStuffingWriter(smtp.sock)
+    write_message(writer, msg, msg.policy.clone(linesep="\r\n"))
+    writer.finish()
+
+    code, resp = smtp.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, resp)
+    return writer.bytes_sent
+
+
+class ResumingTLSContext:
+    """
+    Stand-in for the pool's SSLContext that smtplib wraps one connection's socket with.
+
+    Offers a cached session so the handshake can resume, and times the handshake
+    itself (wrap_socket does it before returning). smtplib only ever calls
+    wrap_socket on the context, for SMTP_SSL and STARTTLS alike.
+    """
+
+    def __init__(self, context: ssl.SSLContext, session: Optional[ssl.SSLSession]):
+        self.context = context
+        self.session = session
+        self.handshake_seconds: Optional[float] = None
+        self.resumed = False
+
+    def wrap_socket(self, sock, **kwargs):
+        started = time.perf_counter()
+        tls_sock = self.context.wrap_socket(sock, session=self.session, **kwargs)
+        self.handshake_seconds = time.perf_counter() - started
+        self.resumed = tls_sock.session_reused
+        return tls_sock
+
+
+class PooledConnection:
+    def __init__(self, smtp: smtplib.SMTP, tls_handshake_seconds: Optional[float] = None, tls_resumed: bool = False):
+        self.smtp = smtp
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+        self.tls_handshake_seconds = tls_handshake_seconds
+        self.tls_resumed = tls_resumed
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """
+    Thread-safe pool of logged-in SMTP connections.
+
+    Connections are reused across messages until they hit max_messages or sit idle
+    longer than max_idle_seconds. Connections idle longer than keepalive_seconds are
+    probed with NOOP before reuse, and a message that fails on a reused connection is
+    retried once on a fresh one.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_ssl: bool = True,
+        size: int = 3,
+        max_messages: int = 50,
+        keepalive_seconds: float = 30,
+        max_idle_seconds: float = 240,
+        timeout: float = 30,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        resume_tls_sessions: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.size = size
+        self.max_messages = max_messages
+        self.keepalive_seconds = keepalive_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self.timeout = timeout
+        # One context for every connection the pool opens
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        # Last TLS session from this host, offered to the next connection so
+        # reconnects resume instead of doing a full handshake
+        self.resume_tls_sessions = resume_tls_sessions
+        self._tls_session: Optional[ssl.SSLSession] = None
+
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+        self.handshakes = 0
+        self.handshake_seconds_total = 0.0
+        self.last_handshake_seconds = 0.0
+        self.messages_sent = 0
+        self.tls_full_handshakes = 0
+        self.tls_resumed_handshakes = 0
+        self.tls_full_seconds_total = 0.0
+        self.tls_resumed_seconds_total = 0.0
+
+    def _connect(self) -> PooledConnection:
+        tls = ResumingTLSContext(self.ssl_context, self._resumable_session())
+        started = time.perf_counter()
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, context=tls, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.starttls(context=tls)
+        try:
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        elapsed = time.perf_counter() - started
+
+        # Read after login: TLS 1.3 servers send the session ticket after the handshake
+        session = smtp.sock.session
+        with self._lock:
+            if self.resume_tls_sessions and session is not None:
+                self._tls_session = session
+            self.handshakes += 1
+            self.handshake_seconds_total += elapsed
+            self.last_handshake_seconds = elapsed
+            if tls.resumed:
+                self.tls_resumed_handshakes += 1
+                self.tls_resumed_seconds_total += tls.handshake_seconds
+            else:
+                self.tls_full_handshakes += 1
+                self.tls_full_seconds_total += tls.handshake_seconds
+        logging.info(
+            f"SMTP connection opened to {self.host}:{self.port} in {elapsed * 1000:.0f} ms "
+            f"(TLS handshake {tls.handshake_seconds * 1000:.0f} ms, {'resumed' if tls.resumed else 'full'})"
+        )
+        return PooledConnection(smtp, tls.handshake_seconds, tls.resumed)
+
+    def _resumable_session(self) -> Optional[ssl.SSLSession]:
+        with self._lock:
+            session = self._tls_session
+        if session is None or time.time() >= session.time + session.timeout:
+            return None
+        return session
+
+    def _is_alive(self, conn: PooledConnection) -> bool:
+        try:
+            return conn.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                with self._lock:
+                    self.misses += 1
+                return self._connect()
+
+            idle_for = time.monotonic() - conn.last_used
+            if idle_for > self.max_idle_seconds or (idle_for > self.keepalive_seconds and not self._is_alive(conn)):
+                conn.close()
+                with self._lock:
+                    self.reconnects += 1
+                continue
+
+            with self._lock:
+                self.hits += 1
+            return conn
+
+    def _checkin(self, conn: PooledConnection):
+        conn.last_used = time.monotonic()
+        if self._closed or conn.messages_sent >= self.max_messages:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a logged-in connection; it is discarded if the caller raises."""
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                yield conn
+            except Exception:
+                conn.close()
+                raise
+            self._checkin(conn)
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg) -> dict:
+        """
+        Send msg over a pooled connection. Returns how it went out: whether the
+        connection was reused and, for a new one, its TLS handshake time and whether
+        the session was resumed.
+        """
+        for attempt in range(2):
+            reused = False
+            try:
+                with self.connection() as conn:
+                    reused = conn.messages_sent > 0
+                    stream_message(conn.smtp, msg)
+                    conn.messages_sent += 1
+            except CONNECTION_ERRORS:
+                # A stale pooled connection gets one retry on a fresh connection
+                if attempt == 0 and reused:
+                    with self._lock:
+                        self.reconnects += 1
+                    logging.warning("SMTP pooled connection dropped, reconnecting")
+                    continue
+                raise
+            with self._lock:
+                self.messages_sent += 1
+            return {
+                "reused_connection": reused,
+                "tls_handshake_ms": None if reused else round(conn.tls_handshake_seconds * 1000, 1),
+                "tls_resumed": None if reused else conn.tls_resumed,
+            }
+
+    def keepalive(self):
+        """NOOP every idle connection, dropping the ones the server has closed."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        alive = []
+        for conn in idle:
+            if time.monotonic() - conn.last_used > self.max_idle_seconds or not self._is_alive(conn):
+                conn.close()
+            else:
+                alive.append(conn)
+        with self._lock:
+            self._idle.extend(alive)
+
+    def close(self):
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle_connections": len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reconnects": self.reconnects,
+                "messages_sent": self.messages_sent,
+                "handshakes": self.handshakes,
+                "last_handshake_ms": round(self.last_handshake_seconds * 1000, 1),
+                "avg_handshake_ms": round(self.handshake_seconds_total / self.handshakes * 1000, 1) if self.handshakes else 0.0,
+                "tls_full_handshakes": self.tls_full_handshakes,
+                "tls_resumed_handshakes": self.tls_resumed_handshakes,
+                "tls_resumption_rate": round(self.tls_resumed_handshakes / self.handshakes, 3) if self.handshakes else 0.0,
+                "avg_tls_full_handshake_ms": round(self.tls_full_seconds_total / self.tls_full_handshakes * 1000, 1) if self.tls_full_handshakes else 0.0,
+                "avg_tls_resumed_handshake_ms": round(self.tls_resumed_seconds_total / self.tls_resumed_handshakes * 1000, 1) if self.tls_resumed_handshakes else 0.0,
+            }
+
+
+_pool: Optional[SMTPConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_smtp_pool() -> SMTPConnectionPool:
+    """Shared pool for all outgoing email, configured from the cached email settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_email_settings()
+            _pool = SMTPConnectionPool(
+                host=settings.smtp_server,
+                port=settings.smtp_port,
+                username=settings.smtp_username,
+                password=settings.smtp_password,
+                use_ssl=settings.smtp_use_ssl,
+                size=settings.pool_size,
+                max_messages=settings.pool_max_messages,
+                keepalive_seconds=settings.pool_keepalive_seconds,
+                max_idle_seconds=settings.pool_max_idle_seconds,
+                ssl_context=get_ssl_context(),
+                resume_tls_sessions=settings.tls_session_resumption,
+            )
+        return _pool
+
+
+def smtp_pool_stats() -> dict:
+    return _pool.stats() if _pool else {}
+
+
+def keepalive_smtp_pool():
+    if _pool is not None:
+        _pool.keepalive()
+
+
+def close_smtp_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# smtplib and MIME encoding are blocking, so every email send runs on this bounded
+# executor instead of the event loop. Sized to the pool: extra threads would only
+# wait on the pool's connection slots.
+_email_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_email_executor() -> ThreadPoolExecutor:
+    global _email_executor
+    with _pool_lock:
+        if _email_executor is None:
+            _email_executor = ThreadPoolExecutor(max_workers=get_email_settings().executor_threads, thread_name_prefix="email")
+        return _email_executor
+
+
+async def run_in_email_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_email_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_email_executor(wait: bool = True):
+    global _email_executor
+    with _pool_lock:
+        executor, _email_executor = _email_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Coroutine, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    """
+    Owns the app's finite background jobs (email deliveries, configuration reloads).
+
+    Every spawned task is referenced until it finishes, so it can't be garbage
+    collected mid-flight, and a failure is logged instead of vanishing with the
+    task. At most `limit` jobs run at once; the rest wait for a slot and are
+    reported as queued. On shutdown, drain() gives in-flight jobs until a deadline
+    and cancels what is left, so they finish before the clients they use (Mongo,
+    the SMTP pool) are closed.
+
+    Long-running loops (the outbox dispatcher, SMTP keepalive) are not jobs: they
+    are stopped explicitly rather than waited for.
+    """
+
+    def __init__(self, limit: int = 16):
+        self.limit = limit
+        self._slots = asyncio.Semaphore(limit)
+        self._tasks = set()
+        self._closed = False
+
+        # Metrics
+        self.queued = 0
+        self.running = 0
+        self.peak_running = 0
+        self.spawned = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.last_drain: Optional[dict] = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(limit=int(os.environ.get('BACKGROUND_TASK_LIMIT', 16)))
+
+    def spawn(self, coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+        """Run coro as a supervised background job; the returned task may be awaited but needn't be."""
+        if self._closed:
+            coro.close()
+            raise RuntimeError("Background tasks are shutting down")
+        task = asyncio.create_task(self._run(coro), name=name)
+        self.spawned += 1
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    async def _run(self, coro: Coroutine):
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            # Cancelled while waiting for a slot: the job never started
+            coro.close()
+            raise
+        finally:
+            self.queued -= 1
+        self.running += 1
+        self.peak_running = max(self.peak_running, self.running)
+        try:
+            return await coro
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.cancelled += 1
+        elif task.exception() is not None:
+            self.failed += 1
+            logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+        else:
+            self.succeeded += 1
+
+    async def drain(self, timeout: float) -> dict:
+        """Stop accepting jobs, wait up to `timeout` seconds for the current ones, then cancel the rest."""
+        self._closed = True
+        started = time.monotonic()
+        pending = set(self._tasks)
+        in_flight = len(pending)
+        if pending:
+            logger.info(f"Waiting up to {timeout}s for {in_flight} background task(s)")
+            _, pending = await asyncio.wait(pending, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+                logger.warning(f"Cancelled {len(pending)} background task(s) still running after {timeout}s")
+        self.last_drain = {
+            "in_flight": in_flight,
+            "finished": in_flight - len(pending),
+            "cancelled": len(pending),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        return self.last_drain
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "queued": self.queued,
+            "peak_running": self.peak_running,
+            "spawned": self.spawned,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "last_drain": self.last_drain,
+        }
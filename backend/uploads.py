@@ -0,0 +1,116 @@
+import logging
+import os
+import re
+from typing import List, Tuple
+
+import orjson
+from fastapi import HTTPException, Request
+from starlette.datastructures import UploadFile
+
+
+# Image slots accepted per card, in the order they are attached to emails
+IMAGE_FIELDS = ("frontImage", "backImage", "receiptImage")
+
+# File parts are named "cards.<index>.<slot>", e.g. "cards.0.frontImage"
+IMAGE_PART_PATTERN = re.compile(r"^cards\.(\d+)\.(frontImage|backImage|receiptImage)$")
+
+# Name of the small JSON part holding every non-image form field
+SUBMISSION_PART = "submission"
+
+MAX_SUBMISSION_JSON_BYTES = 64 * 1024
+# Per image, decoded. Images the pipeline keeps as uploaded (PDF receipts, formats
+# Pillow can't read) are stored as one Mongo document, which BSON caps at 16 MB
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 15 * 1024 * 1024))
+MAX_CARDS = 20
+MAX_IMAGE_PARTS = MAX_CARDS * len(IMAGE_FIELDS)
+
+
+async def read_upload_bytes(upload: UploadFile) -> bytes:
+    """
+    Read an already spooled upload back with a single read.
+
+    The image pipeline needs each part as one bytes object, so it is read into
+    exactly that; growing a buffer chunk by chunk and copying it out would hold
+    every part in memory twice.
+    """
+    await upload.seek(0)
+    return await upload.read()
+
+
+async def parse_multipart_submission(request: Request) -> Tuple[dict, List[dict]]:
+    """
+    Parse a multipart/form-data gift card submission.
+
+    Starlette streams every file part chunk-by-chunk into a SpooledTemporaryFile,
+    so image bytes never exist as base64 strings. The "submission" part carries the
+    same JSON as /api/submit-gift-card minus the images; each image is attached to
+    its card as {"name", "type", "size", "data": <raw bytes>}.
+
+    Returns the submission payload and a size report for every part received.
+    """
+    form = await request.form(max_files=MAX_IMAGE_PARTS, max_fields=1)
+    try:
+        raw_submission = form.get(SUBMISSION_PART)
+        if not isinstance(raw_submission, str):
+            raise HTTPException(status_code=422, detail=f"Missing '{SUBMISSION_PART}' JSON part")
+        submission_size = len(raw_submission.encode())
+        if submission_size > MAX_SUBMISSION_JSON_BYTES:
+            raise HTTPException(status_code=413, detail=f"'{SUBMISSION_PART}' part is too large")
+
+        try:
+            payload = orjson.loads(raw_submission)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"'{SUBMISSION_PART}' part is not valid JSON")
+        if not isinstance(payload, dict) or not isinstance(payload.get("cards"), list):
+            raise HTTPException(status_code=422, detail="Submission must include a 'cards' list")
+
+        cards = payload["cards"]
+        if len(cards) > MAX_CARDS:
+            raise HTTPException(status_code=422, detail=f"At most {MAX_CARDS} cards per submission")
+
+        parts = [{"field": SUBMISSION_PART, "content_type": "application/json", "size": submission_size}]
+        seen_fields = set()
+
+        for field_name, value in form.multi_items():
+            if field_name == SUBMISSION_PART:
+                continue
+            match = IMAGE_PART_PATTERN.match(field_name)
+            if not match or not isinstance(value, UploadFile):
+                raise HTTPException(status_code=422, detail=f"Unexpected form part '{field_name}'")
+
+            # A repeated part would silently replace the earlier image
+            if field_name in seen_fields:
+                raise HTTPException(status_code=422, detail=f"Form part '{field_name}' was sent more than once")
+            seen_fields.add(field_name)
+            if value.size is not None and value.size > MAX_IMAGE_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Form part '{field_name}' is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB",
+                )
+
+            index, slot = int(match.group(1)), match.group(2)
+            if index >= len(cards) or not isinstance(cards[index], dict):
+                raise HTTPException(status_code=422, detail=f"Form part '{field_name}' has no matching card")
+
+            data = await read_upload_bytes(value)
+            content_type = value.content_type or "application/octet-stream"
+            cards[index][slot] = {
+                "name": value.filename or f"{slot}.bin",
+                "type": content_type,
+                "size": len(data),
+                "data": data,
+            }
+            parts.append({
+                "field": field_name,
+                "filename": value.filename,
+                "content_type": content_type,
+                "size": len(data),
+            })
+
+        logging.info(
+            f"Multipart submission parsed: {len(parts)} parts, "
+            f"{sum(part['size'] for part in parts)} bytes"
+        )
+        return payload, parts
+    finally:
+        await form.close()
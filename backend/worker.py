@@ -0,0 +1,40 @@
+"""
+Standalone email delivery worker.
+
+The server profile delivers email_outbox jobs from a dispatcher inside the app.
+Serverless deployments rely on the /api/cron/deliver-emails cron instead; where a
+per-minute cron isn't available, or emails should go out within seconds, run
+this next to them:
+
+    cd backend && python worker.py          # poll every EMAIL_OUTBOX_POLL_SECONDS
+    cd backend && python worker.py --once   # one drain, e.g. from a system cron
+"""
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+from server import db, email_dispatcher, background_tasks, ensure_indexes, DATABASE_INDEXES, smtp_pool
+
+
+async def main(once: bool):
+    await ensure_indexes(db, DATABASE_INDEXES)
+    # SIGTERM/Ctrl-C stop claiming; in-flight deliveries are drained below
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, email_dispatcher.stop)
+    try:
+        if once:
+            logging.info(f"Email delivery drain: {await email_dispatcher.drain()}")
+        else:
+            await email_dispatcher.run()
+    finally:
+        await background_tasks.drain(float(os.environ.get('SHUTDOWN_DRAIN_SECONDS', 8)))
+        smtp_pool.shutdown_email_executor()
+        smtp_pool.close_smtp_pool()
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main("--once" in sys.argv[1:]))
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+
+# Write concern per collection unless overridden by MONGO_WRITE_CONCERN_<COLLECTION>.
+# Submissions are what customers get paid from, so they wait for a majority;
+# uptime pings only need the primary's ack.
+DEFAULT_WRITE_CONCERNS = {
+    "gift_card_submissions": "majority",
+    "status_checks": "1",
+}
+
+# Upper bounds of the batch size histogram buckets reported in stats()
+BATCH_SIZE_BUCKETS = (1, 4, 16, 64)
+
+# Window over which inserts_per_second is measured
+RATE_WINDOW_SECONDS = 60
+
+
+def parse_write_concern(value: str) -> WriteConcern:
+    """'majority', a node count ('0', '1', '2'...), optionally ',j' for journaled, e.g. 'majority,j'."""
+    w, _, journal = value.strip().partition(",")
+    w = int(w) if w.isdigit() else w
+    return WriteConcern(w=w, j=True) if journal.strip() == "j" else WriteConcern(w=w)
+
+
+def configured_collection(db, name: str):
+    """The collection with the write concern configured for it."""
+    value = os.environ.get(f"MONGO_WRITE_CONCERN_{name.upper()}", DEFAULT_WRITE_CONCERNS.get(name))
+    if not value:
+        return db[name]
+    return db.get_collection(name, write_concern=parse_write_concern(value))
+
+
+class InsertBatcher:
+    """
+    Coalesces inserts into one collection into insert_many calls.
+
+    The first insert into an empty batch starts a short timer (max_delay_ms); every
+    insert arriving before it fires joins the same batch, which is written with one
+    unordered insert_many as soon as the timer fires or the batch is full. Each
+    caller awaits its own future, resolved with its inserted _id once the batch is
+    acknowledged, or with its own error (e.g. a duplicate key) if that document
+    alone was rejected.
+    """
+
+    def __init__(self, db, collection_name: str, max_batch_size: int = 100, max_delay_ms: float = 5):
+        self.db = db
+        self.collection_name = collection_name
+        self._collection = None
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes = set()
+
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.batch_size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.write_seconds = 0.0
+        self._recent = deque()
+        self._first_write_at = None
+
+    @classmethod
+    def from_env(cls, db, collection_name: str):
+        return cls(
+            db,
+            collection_name,
+            max_batch_size=int(os.environ.get('INSERT_BATCH_MAX_SIZE', 100)),
+            max_delay_ms=float(os.environ.get('INSERT_BATCH_MAX_DELAY_MS', 5)),
+        )
+
+    @property
+    def collection(self):
+        # Resolved on first use so creating a batcher never connects to the database
+        if self._collection is None:
+            self._collection = configured_collection(self.db, self.collection_name)
+        return self._collection
+
+    async def insert(self, document: dict):
+        """Insert document as part of the current batch; returns its _id."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        documents = [document for document, _ in batch]
+        errors = {}
+        started = time.perf_counter()
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every document without a write error was still inserted
+            for error in e.details.get("writeErrors", []):
+                error_class = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                errors[error["index"]] = error_class(error.get("errmsg"), error.get("code"), error)
+        except Exception as e:
+            logging.error(f"Batched insert of {len(batch)} documents into {self.collection_name} failed: {e}")
+            errors = {index: e for index in range(len(batch))}
+        self._record(len(batch), len(errors), time.perf_counter() - started)
+
+        for index, (document, future) in enumerate(batch):
+            if future.done():  # the caller was cancelled
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(document["_id"])
+
+    def _record(self, size: int, failed: int, seconds: float):
+        self.batches += 1
+        self.inserted += size - failed
+        self.failed += failed
+        self.largest_batch = max(self.largest_batch, size)
+        self.write_seconds += seconds
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+        self.batch_size_histogram[bucket] += 1
+
+        now = time.monotonic()
+        if self._first_write_at is None:
+            self._first_write_at = now
+        self._recent.append((now, size - failed))
+        while self._recent and self._recent[0][0] < now - RATE_WINDOW_SECONDS:
+            self._recent.popleft()
+
+    async def close(self):
+        """Write whatever is pending and wait for in-flight batches."""
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        recent = sum(count for at, count in self._recent if at >= now - RATE_WINDOW_SECONDS)
+        # Until the process has been writing for a full window, rate over what it has
+        window = min(RATE_WINDOW_SECONDS, max(now - self._first_write_at, 1.0)) if self._first_write_at else RATE_WINDOW_SECONDS
+        labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "write_concern": self.collection.write_concern.document if self._collection is not None else None,
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay * 1000,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "average_batch_size": round((self.inserted + self.failed) / self.batches, 2) if self.batches else 0,
+            "largest_batch": self.largest_batch,
+            "batch_sizes": dict(zip(labels, self.batch_size_histogram)),
+            "average_write_ms": round(self.write_seconds / self.batches * 1000, 2) if self.batches else 0,
+            "inserts_per_second": round(recent / window, 2),
+            "pending": len(self._pending),
+        }
@@ -1 +0,0 @@
-from server import app
\ No newline at end of file